@@ -0,0 +1,129 @@
+"""
+Batched LLM triage: many compact incident records per prompt
+"""
+from typing import Dict, List, Tuple
+import json
+from pydantic import ValidationError
+from app.config.settings import settings
+from app.models.data_models import BatchTriageResult
+from app.agents.prompt_builder import canonical_json
+from app.services.gemini_client import gemini_client
+
+# Shared instructions come first so every batch prompt has the same prefix
+BATCH_TRIAGE_INSTRUCTIONS = """You are triaging revenue leakage incidents.
+Each input line is one incident as JSON with keys: id, type, impact (financial impact),
+cur (currency), cust (customer ID) and desc (description).
+
+For every incident, confirm the classification, set the severity and priority and
+name the most relevant evidence sources.
+
+Respond with ONLY a JSON array, no prose and no code fences. Include exactly one
+object per input incident, using this schema:
+{"id": "<incident id>", "severity": "low|medium|high|critical", "priority": "P1|P2|P3|P4",
+ "classification_confirmed": true|false, "evidence_sources": ["..."], "notes": "<one sentence>"}
+"""
+
+GENERATION_CONFIG = {"temperature": 0.0}
+
+def compact_incident_record(incident_data: dict) -> dict:
+    """Minimal incident fields needed for triage"""
+    related_entities = incident_data.get("related_entities") or {}
+    return {
+        "id": incident_data.get("id"),
+        "type": incident_data.get("type"),
+        "impact": incident_data.get("financial_impact", 0),
+        "cur": incident_data.get("currency", "USD"),
+        "cust": related_entities.get("customer_id"),
+        "desc": (incident_data.get("description") or "")[:settings.TRIAGE_BATCH_DESCRIPTION_CHARS]
+    }
+
+def build_batch_triage_prompt(incidents_data: List[dict]) -> str:
+    """Pack several incidents into one triage prompt"""
+    lines = [canonical_json(compact_incident_record(incident_data)) for incident_data in incidents_data]
+    return BATCH_TRIAGE_INSTRUCTIONS + "\nIncidents:\n" + "\n".join(lines)
+
+def parse_batch_triage_response(text: str, expected_ids: List[str]) -> Tuple[Dict[str, BatchTriageResult], List[str]]:
+    """
+    Parse and validate a batched triage response
+    
+    Args:
+        text: Raw LLM response
+        expected_ids: IDs of the incidents sent in the prompt
+        
+    Returns:
+        Validated results by incident ID, and the IDs whose result was
+        missing or invalid
+    """
+    results = {}
+    start, end = text.find("["), text.rfind("]")
+    try:
+        items = json.loads(text[start:end + 1]) if start != -1 and end > start else []
+    except json.JSONDecodeError:
+        items = []
+    
+    expected = set(expected_ids)
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or str(item.get("id")) not in expected:
+            continue
+        try:
+            result = BatchTriageResult(**{**item, "id": str(item["id"])})
+        except ValidationError:
+            continue
+        results[result.id] = result
+    
+    failed = [incident_id for incident_id in expected_ids if incident_id not in results]
+    return results, failed
+
+async def batch_triage(incidents_data: List[dict], batch_size: int = None,
+                       max_attempts: int = None, client=None) -> Tuple[Dict[str, BatchTriageResult], List[str]]:
+    """
+    Triage incidents with several incidents per LLM prompt
+    
+    All batches of an attempt run concurrently through the client's batch
+    API. Only incidents whose result failed to parse or validate are packed
+    into new batches for the next attempt; those attempts bypass the response
+    cache, and responses with failed results are dropped from it.
+    
+    Args:
+        incidents_data: Incidents as dictionaries
+        batch_size: Incidents per prompt (defaults to TRIAGE_BATCH_SIZE)
+        max_attempts: Attempts per incident (defaults to TRIAGE_BATCH_MAX_ATTEMPTS)
+        client: GeminiClient to use (defaults to the global client)
+        
+    Returns:
+        Validated results by incident ID, and the IDs still failing after
+        the last attempt
+    """
+    batch_size = batch_size or settings.TRIAGE_BATCH_SIZE
+    max_attempts = max_attempts or settings.TRIAGE_BATCH_MAX_ATTEMPTS
+    client = client or gemini_client
+    
+    incidents_by_id = {incident_data["id"]: incident_data for incident_data in incidents_data}
+    results = {}
+    pending = list(incidents_by_id)
+    for attempt in range(max_attempts):
+        if not pending:
+            break
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        prompts = [build_batch_triage_prompt([incidents_by_id[incident_id] for incident_id in batch]) for batch in batches]
+        # Retried prompts can match a cached unusable response, so only the first attempt reads the cache
+        responses = await client.generate_batch(
+            prompts,
+            generation_config=GENERATION_CONFIG,
+            agent_role="triage",
+            task_type="batch_triage",
+            use_cache=attempt == 0
+        )
+        
+        pending = []
+        for batch, prompt, response in zip(batches, prompts, responses):
+            if response["status"] != "success":
+                pending.extend(batch)
+                continue
+            parsed, failed = parse_batch_triage_response(response["content"], batch)
+            results.update(parsed)
+            if failed:
+                client.invalidate(prompt, GENERATION_CONFIG)
+            pending.extend(failed)
+    
+    return results, pending
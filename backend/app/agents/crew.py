@@ -11,7 +11,10 @@ class RLDAgents:
     def __init__(self):
         """Initialize all agents"""
         # Initialize LLM for CrewAI agents
-        if settings.GEMINI_API_KEY:
+        if settings.LLM_BACKEND == "stub":
+            from app.agents.stub_chat_model import StubChatModel
+            self.llm = StubChatModel()
+        elif settings.GEMINI_API_KEY:
             self.llm = ChatGoogleGenerativeAI(
                 model="gemini-1.5-pro",
                 google_api_key=settings.GEMINI_API_KEY
@@ -0,0 +1,282 @@
+"""
+Bounded-parallel pipeline running incidents through the agent stages
+"""
+from typing import Any, Callable, Dict, List, Optional
+import functools
+import itertools
+import json
+import os
+import queue
+import threading
+from crewai import Crew
+from app.config.settings import settings
+from app.agents.tasks import rld_tasks
+from app.services.evidence_collector import EvidenceCollector
+from app.services.llm_metrics import llm_metrics
+from app.services.qdrant_client import qdrant_service
+
+STAGES = ["triage", "evidence", "rca", "ticket"]
+
+# Evidence sources consulted for each incident type
+EVIDENCE_SOURCES = {
+    "missing_charge": ["provisioning records", "billing records", "contracts"],
+    "incorrect_rate": ["billing records", "contract rate clauses"],
+    "usage_mismatch": ["billing records", "usage logs"],
+    "duplicate_entry": ["billing records"]
+}
+
+def crew_token_usage(crew) -> dict:
+    """Prompt and completion token counts reported by a finished crew"""
+    usage = getattr(crew, "usage_metrics", None) or {}
+    if not isinstance(usage, dict):
+        usage = usage.dict() if hasattr(usage, "dict") else vars(usage)
+    return {
+        "input_tokens": usage.get("prompt_tokens") or 0,
+        "output_tokens": usage.get("completion_tokens") or 0
+    }
+
+def run_task(task, task_type: str) -> str:
+    """Run a single CrewAI task, recording it in the LLM metrics, and return its output"""
+    crew = Crew(agents=[task.agent], tasks=[task], verbose=False)
+    model = getattr(task.agent.llm, "model_name", None) or getattr(task.agent.llm, "model", None) or "unknown"
+    with llm_metrics.track(task.agent.role, task_type, str(model)) as call:
+        output = str(crew.kickoff())
+        call.update(crew_token_usage(crew))
+    return output
+
+def triage_stage(incident_data: dict, results: dict, customer_tiers: Optional[Dict[str, str]] = None,
+                 incident_history: Optional[Dict[str, int]] = None) -> dict:
+    """Rule-based triage, escalating to the LLM triage task when needed"""
+    decisions, tasks = rld_tasks.plan_triage([incident_data], customer_tiers, incident_history)
+    output = decisions[incident_data["id"]].dict()
+    if tasks:
+        output["analysis"] = run_task(tasks[0], "triage")
+    return output
+
+def apply_triage(incident_data: dict, results: dict) -> dict:
+    """Incident data with the severity and priority assigned by the triage stage"""
+    triage = results.get("triage")
+    if not isinstance(triage, dict):
+        return incident_data
+    return {
+        **incident_data,
+        **{field: triage[field] for field in ("severity", "priority") if triage.get(field)}
+    }
+
+def evidence_stage(incident_data: dict, results: dict) -> str:
+    """Collect evidence with the evidence collector agent"""
+    sources = EVIDENCE_SOURCES.get(incident_data.get("type"), [])
+    return run_task(rld_tasks.collect_evidence_task(incident_data, sources), "evidence")
+
+def rca_stage(incident_data: dict, results: dict):
+    """
+    Root cause analysis over the collected evidence
+    
+    A close enough fix in kb_fixes is reused as is; a weaker match is passed
+    to the RCA task as a hint. Reuse needs semantic embeddings
+    (EMBEDDING_BACKEND=gemini): placeholder embeddings give every fix for
+    the same type, customer and service a full score, so without them the
+    fix is only a hint and its score is left out.
+    """
+    prior_fix = qdrant_service.find_similar_fix(incident_data)
+    if prior_fix and not qdrant_service.semantic_embeddings:
+        prior_fix = {**prior_fix, "score": None}
+    if prior_fix and prior_fix["score"] is not None and prior_fix["score"] >= settings.KB_REUSE_THRESHOLD:
+        return {
+            "reused_from": prior_fix["incident_id"],
+            "score": prior_fix["score"],
+            "root_cause": prior_fix["root_cause"],
+            "resolution": prior_fix["resolution"]
+        }
+    return run_task(rld_tasks.root_cause_analysis_task(incident_data, results["evidence"], prior_fix=prior_fix), "rca")
+
+def ticket_stage(incident_data: dict, results: dict) -> str:
+    """Create the investigation ticket"""
+    return run_task(rld_tasks.create_ticket_task(incident_data, results["rca"]), "ticket")
+
+DEFAULT_STAGE_HANDLERS = {
+    "triage": triage_stage,
+    "evidence": evidence_stage,
+    "rca": rca_stage,
+    "ticket": ticket_stage
+}
+
+class IncidentPipeline:
+    """
+    Run incidents through triage, evidence, RCA and ticket stages
+
+    Every stage has its own bounded pool of worker threads and its own
+    priority queue, so later stages work on some incidents while earlier
+    stages are still busy with others. Incidents with the highest financial
+    impact are picked first at every stage, and stages after triage see the
+    severity and priority it assigned. Each completed stage is appended
+    to a JSON lines state file, and a rerun with the same file skips the
+    stages that already finished.
+    """
+
+    def __init__(self, stage_workers: Optional[Dict[str, int]] = None,
+                 stage_handlers: Optional[Dict[str, Callable[[dict, dict], Any]]] = None,
+                 state_path: Optional[str] = None,
+                 progress_callback: Optional[Callable[[dict], None]] = None,
+                 evidence_collector: Optional[EvidenceCollector] = None,
+                 customer_tiers: Optional[Dict[str, str]] = None,
+                 incident_history: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            stage_workers: Worker threads per stage (defaults to PIPELINE_WORKERS_PER_STAGE)
+            stage_handlers: Overrides of the stage functions, called as
+                ``handler(incident_data, results)`` where ``results`` holds
+                the outputs of earlier stages
+            state_path: JSON lines file used to resume runs (defaults to PIPELINE_STATE_PATH)
+            progress_callback: Called with a progress snapshot after each stage completes
+            evidence_collector: Collects evidence from indexed records instead
+                of the evidence collector agent
+            customer_tiers: Plan tier per customer ID, used by triage
+            incident_history: Number of earlier incidents per customer ID, used by triage
+        """
+        self.stage_workers = {stage: settings.PIPELINE_WORKERS_PER_STAGE for stage in STAGES}
+        self.stage_workers.update(stage_workers or {})
+        self.stage_handlers = dict(DEFAULT_STAGE_HANDLERS)
+        if customer_tiers or incident_history:
+            self.stage_handlers["triage"] = functools.partial(
+                triage_stage, customer_tiers=customer_tiers, incident_history=incident_history
+            )
+        if evidence_collector is not None:
+            self.stage_handlers["evidence"] = lambda incident_data, results: evidence_collector.collect(incident_data)
+        self.stage_handlers.update(stage_handlers or {})
+        self.state_path = state_path or settings.PIPELINE_STATE_PATH
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> Dict[str, dict]:
+        """Replay the state file into completed stage outputs per incident"""
+        state = {}
+        if not os.path.exists(self.state_path):
+            return state
+        with open(self.state_path) as state_file:
+            for line in state_file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                state.setdefault(entry["incident_id"], {})[entry["stage"]] = entry["output"]
+        return state
+
+    def _record(self, incident_id: str, stage: str, output: Any):
+        """Append a completed stage to the state file (caller holds the lock)"""
+        self._state_file.write(json.dumps(
+            {"incident_id": incident_id, "stage": stage, "output": output}, default=str
+        ) + "\n")
+        self._state_file.flush()
+
+    def _report(self):
+        """Send a progress snapshot to the callback (caller holds the lock)"""
+        if not self.progress_callback:
+            return
+        try:
+            self.progress_callback({
+                "total": self._total,
+                "completed": self._completed,
+                "failed": len(self.errors),
+                "stages": dict(self._stage_counts)
+            })
+        except Exception as e:
+            # A failing callback must not kill the worker and stall the run
+            print(f"Error in pipeline progress callback: {e}")
+
+    def _finish_one(self):
+        """Mark one incident as done with the pipeline (caller holds the lock)"""
+        self._remaining -= 1
+        if self._remaining == 0:
+            self._all_done.set()
+
+    def _worker(self, stage: str):
+        """Process incidents from one stage queue until a stop sentinel arrives"""
+        handler = self.stage_handlers[stage]
+        next_stage = STAGES[STAGES.index(stage) + 1] if stage != STAGES[-1] else None
+        stage_queue = self._queues[stage]
+
+        while True:
+            item = stage_queue.get()
+            incident_id = item[2]
+            if incident_id is None:
+                break
+
+            incident_data = self._incidents[incident_id]
+            if stage != "triage":
+                incident_data = apply_triage(incident_data, self.results[incident_id])
+            try:
+                output = handler(incident_data, self.results[incident_id])
+            except Exception as e:
+                with self._lock:
+                    self.errors[incident_id] = f"{stage}: {e}"
+                    self._finish_one()
+                    self._report()
+                continue
+
+            with self._lock:
+                self.results[incident_id][stage] = output
+                self._record(incident_id, stage, output)
+                self._stage_counts[stage] += 1
+                if next_stage is None:
+                    self._completed += 1
+                    self._finish_one()
+                self._report()
+
+            if next_stage:
+                self._queues[next_stage].put(item)
+
+    def run(self, incidents: List[dict]) -> Dict[str, dict]:
+        """
+        Run incidents through all stages
+
+        Args:
+            incidents: Incidents as dictionaries
+
+        Returns:
+            Stage outputs per incident ID. Incidents that failed a stage are
+            listed in ``self.errors`` and are retried from that stage on the
+            next run.
+        """
+        state = self._load_state()
+        self._incidents = {incident["id"]: incident for incident in incidents}
+        self._queues = {stage: queue.PriorityQueue() for stage in STAGES}
+        self.results = {}
+        self.errors = {}
+        self._stage_counts = {stage: 0 for stage in STAGES}
+        self._completed = 0
+        self._total = len(self._incidents)
+        self._remaining = 0
+        self._all_done = threading.Event()
+
+        sequence = itertools.count()
+        for incident_id, incident_data in self._incidents.items():
+            self.results[incident_id] = dict(state.get(incident_id, {}))
+            next_stage = next((stage for stage in STAGES if stage not in self.results[incident_id]), None)
+            if next_stage is None:
+                self._completed += 1
+                continue
+            priority = -float(incident_data.get("financial_impact") or 0.0)
+            self._queues[next_stage].put((priority, next(sequence), incident_id))
+            self._remaining += 1
+
+        if self._remaining == 0:
+            return self.results
+
+        threads = [
+            threading.Thread(target=self._worker, args=(stage,), daemon=True)
+            for stage in STAGES
+            for _ in range(self.stage_workers[stage])
+        ]
+        with open(self.state_path, "a") as self._state_file:
+            for thread in threads:
+                thread.start()
+            self._all_done.wait()
+
+            # Stop sentinels sort after any real work
+            for stage in STAGES:
+                for _ in range(self.stage_workers[stage]):
+                    self._queues[stage].put((float("inf"), next(sequence), None))
+            for thread in threads:
+                thread.join()
+
+        return self.results
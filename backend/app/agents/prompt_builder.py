@@ -0,0 +1,142 @@
+"""
+Token-budgeted prompt assembly for agent tasks
+"""
+from datetime import datetime, date
+from typing import Any, Callable, List, Tuple
+import json
+import logging
+import math
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token for English text and compact JSON
+CHARS_PER_TOKEN = 4
+
+EMPTY_VALUES = (None, "", [], {})
+
+# Text fields are truncated rather than dropped if at least this much still fits
+MIN_TRUNCATED_CHARS = 200
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def compact_value(value: Any) -> Any:
+    """
+    Reduce a value to its canonical compact form
+
+    Models become dictionaries, empty values are dropped, datetimes become
+    ISO strings (dates only when there is no time part) and floats are
+    rounded to cents.
+    """
+    if isinstance(value, BaseModel):
+        value = value.dict()
+    if isinstance(value, dict):
+        compacted = {key: compact_value(item) for key, item in value.items()}
+        return {key: item for key, item in compacted.items() if item not in EMPTY_VALUES}
+    if isinstance(value, (list, tuple)):
+        compacted = [compact_value(item) for item in value]
+        return [item for item in compacted if item not in EMPTY_VALUES]
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(timespec="seconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+def canonical_json(value: Any) -> str:
+    """Compact, key-sorted JSON of a value"""
+    return json.dumps(compact_value(value), separators=(",", ":"), sort_keys=True, default=str)
+
+class PromptBuilder:
+    """
+    Build prompts as fixed instructions followed by budgeted input fields
+
+    The instructions come first and never change between incidents, so the
+    prompt shares a common prefix that provider-side prompt caching can
+    reuse. Input fields are rendered one per line in canonical form; when
+    the prompt exceeds the token budget, fields are dropped from the lowest
+    priority (highest number) up, with long text fields truncated to the
+    remaining room instead where that is worthwhile. Priority 0 fields are
+    never dropped; if they alone exceed the budget, the largest ones are
+    truncated in rendered form (structured values as their serialized JSON)
+    and a warning is logged if the instructions alone still do not fit.
+    """
+
+    def __init__(self, instructions: str, budget_tokens: int,
+                 token_counter: Callable[[str], int] = estimate_tokens):
+        """
+        Args:
+            instructions: Static task instructions placed at the start of the prompt
+            budget_tokens: Maximum prompt size in tokens
+            token_counter: Function counting the tokens of a text
+        """
+        self.instructions = instructions.strip()
+        self.budget_tokens = budget_tokens
+        self.token_counter = token_counter
+
+    def _render(self, fields: List[Tuple[str, Any, int]]) -> str:
+        """Instructions followed by one line per field"""
+        lines = [
+            f"{name}: {value if isinstance(value, str) else canonical_json(value)}"
+            for name, value, _ in fields
+        ]
+        return self.instructions + "\n\nInput:\n" + "\n".join(lines)
+
+    def build(self, fields: List[Tuple[str, Any, int]]) -> str:
+        """
+        Assemble a prompt within the token budget
+
+        Args:
+            fields: ``(name, value, priority)`` tuples in display order
+
+        Returns:
+            The prompt text
+        """
+        kept = [
+            (name, compact_value(value), priority)
+            for name, value, priority in fields
+            if compact_value(value) not in EMPTY_VALUES
+        ]
+        prompt = self._render(kept)
+
+        droppable = sorted((field for field in kept if field[2] > 0), key=lambda field: field[2], reverse=True)
+        for field in droppable:
+            if self.token_counter(prompt) <= self.budget_tokens:
+                return prompt
+            index = kept.index(field)
+            del kept[index]
+            prompt = self._render(kept)
+
+            # Shorten long text such as earlier agent output rather than lose it entirely
+            name, value, priority = field
+            room_chars = (self.budget_tokens - self.token_counter(prompt)) * CHARS_PER_TOKEN - len(name) - 5
+            if isinstance(value, str) and room_chars >= MIN_TRUNCATED_CHARS:
+                kept.insert(index, (name, value[:room_chars] + "...", priority))
+                prompt = self._render(kept)
+
+        # Only required fields are left; truncate the largest until the prompt fits
+        overflow = self.token_counter(prompt) - self.budget_tokens
+        while overflow > 0:
+            rendered = [
+                value if isinstance(value, str) else canonical_json(value)
+                for _, value, _ in kept
+            ]
+            shrinkable = [index for index, text in enumerate(rendered) if len(text) > 3]
+            if not shrinkable:
+                logger.warning(
+                    "Prompt exceeds its %d token budget by %d tokens after truncating every field",
+                    self.budget_tokens, overflow
+                )
+                break
+            index = max(shrinkable, key=lambda i: len(rendered[i]))
+            name, _, priority = kept[index]
+            text = rendered[index]
+            keep_chars = max(len(text) - overflow * CHARS_PER_TOKEN - 3, 0)
+            kept[index] = (name, text[:keep_chars] + "...", priority)
+            prompt = self._render(kept)
+            overflow = self.token_counter(prompt) - self.budget_tokens
+
+        return prompt
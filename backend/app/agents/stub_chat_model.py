@@ -0,0 +1,44 @@
+"""
+LangChain chat model over the offline stub LLM, for CrewAI agents
+"""
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from app.services.stub_llm import StubGenerativeModel
+
+class StubChatModel(BaseChatModel):
+    """
+    Drop-in replacement for ``ChatGoogleGenerativeAI`` that never calls the network
+
+    Replies are wrapped as a final answer so CrewAI agents finish the task
+    in a single step.
+    """
+
+    model_name: str = "stub"
+    latency_ms: Optional[float] = None
+    output_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "rld-stub"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        """Templated reply to the conversation so far"""
+        prompt = "\n".join(str(message.content) for message in messages)
+        response = StubGenerativeModel(self.latency_ms, self.output_tokens).generate_content(prompt)
+        usage = response.usage_metadata
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(
+                content=f"Thought: I now know the final answer\nFinal Answer: {response.text}"
+            ))],
+            llm_output={
+                "model_name": self.model_name,
+                "token_usage": {
+                    "prompt_tokens": usage.prompt_token_count,
+                    "completion_tokens": usage.candidates_token_count,
+                    "total_tokens": usage.total_token_count
+                }
+            }
+        )
@@ -3,7 +3,70 @@ CrewAI Task Definitions for Revenue Leakage Detection
 """
 from crewai import Task
 from app.agents.crew import rld_agents
-from datetime import datetime
+from app.models.data_models import TriageDecision
+from app.models.triage_rules import fast_triage
+from app.agents.batch_triage import build_batch_triage_prompt
+from app.agents.prompt_builder import PromptBuilder
+from app.config.settings import settings
+from typing import Dict, List, Optional, Tuple
+
+# Task instructions are fixed text placed before the incident data, so
+# prompts for the same task share a cacheable prefix
+TRIAGE_INSTRUCTIONS = """Analyze the revenue leakage incident given as input and classify it.
+
+Please:
+1. Confirm the incident classification
+2. Verify the severity level
+3. Suggest initial investigation priorities
+4. Identify which evidence sources would be most relevant
+
+Provide your analysis in a structured format."""
+
+EVIDENCE_INSTRUCTIONS = """Collect evidence for the revenue leakage incident given as input.
+
+Please:
+1. Retrieve the listed evidence sources
+2. Organize the evidence in a structured format
+3. Highlight any anomalies or inconsistencies found
+4. Prepare the evidence for root cause analysis
+
+Include all relevant data points that would help with analysis."""
+
+RCA_INSTRUCTIONS = """Perform root cause analysis for the revenue leakage incident given as input,
+using the collected evidence and any similar resolved incident.
+
+Please:
+1. Analyze the evidence to identify the root cause
+2. Formulate 2-3 hypotheses about why this leakage occurred
+3. For each hypothesis, explain the supporting evidence
+4. Identify any systemic issues that might cause similar problems
+5. Suggest preventive measures to avoid recurrence
+
+Return your analysis in JSON format with clear hypotheses and recommendations."""
+
+TICKET_INSTRUCTIONS = """Create an investigation ticket for the revenue leakage incident given as input.
+
+Please:
+1. Create a detailed ticket for investigation
+2. Specify the assigned team or individual
+3. Include all relevant information for resolution
+4. Set appropriate priority based on severity and impact
+5. Suggest next steps for resolution
+6. Include links to related records and evidence
+
+Return the ticket details in a structured format."""
+
+def compact_incident(incident_data: dict) -> dict:
+    """Core incident fields included in every task prompt"""
+    return {
+        "id": incident_data.get("id"),
+        "type": incident_data.get("type"),
+        "severity": incident_data.get("severity"),
+        "priority": incident_data.get("priority"),
+        "financial_impact": incident_data.get("financial_impact"),
+        "currency": incident_data.get("currency"),
+        "members": len(incident_data.get("member_ids") or []) or None
+    }
 
 class RLDTasks:
     """Collection of CrewAI tasks for revenue leakage detection"""
@@ -12,103 +75,109 @@ class RLDTasks:
         """Initialize all tasks"""
         pass
     
-    def triage_incident_task(self, incident_data: dict) -> Task:
+    def plan_triage(self, incidents_data: List[dict], customer_tiers: Optional[Dict[str, str]] = None,
+                    incident_history: Optional[Dict[str, int]] = None) -> Tuple[Dict[str, TriageDecision], List[Task]]:
+        """
+        Triage routine incidents by rules and build LLM tasks for the rest
+        
+        Args:
+            incidents_data: Incidents as dictionaries
+            customer_tiers: Plan tier per customer ID
+            incident_history: Number of earlier incidents per customer ID
+            
+        Returns:
+            Rule-based decisions by incident ID for every incident, and
+            triage tasks for the incidents that still need the LLM
+        """
+        customer_tiers = customer_tiers or {}
+        incident_history = incident_history or {}
+        decisions = {}
+        tasks = []
+        for incident_data in incidents_data:
+            customer_id = (incident_data.get("related_entities") or {}).get("customer_id")
+            decision = fast_triage(
+                incident_data,
+                customer_tier=customer_tiers.get(customer_id),
+                prior_incidents=incident_history.get(customer_id, 0)
+            )
+            decisions[decision.incident_id] = decision
+            if decision.needs_llm:
+                tasks.append(self.triage_incident_task(incident_data, triage_hint=decision))
+        return decisions, tasks
+    
+    def triage_incident_task(self, incident_data: dict, triage_hint: Optional[TriageDecision] = None) -> Task:
         """Create a task for triaging an incident"""
+        builder = PromptBuilder(TRIAGE_INSTRUCTIONS, settings.PROMPT_TOKEN_BUDGETS["triage"])
         return Task(
-            description=f"""Analyze the following revenue leakage incident and classify it:
-            
-            Incident Details:
-            Type: {incident_data.get('type', 'Unknown')}
-            Severity: {incident_data.get('severity', 'Unknown')}
-            Description: {incident_data.get('description', 'No description provided')}
-            Financial Impact: {incident_data.get('financial_impact', 0)} {incident_data.get('currency', 'USD')}
-            
-            Please:
-            1. Confirm the incident classification
-            2. Verify the severity level
-            3. Suggest initial investigation priorities
-            4. Identify which evidence sources would be most relevant
-            
-            Provide your analysis in a structured format.""",
+            description=builder.build([
+                ("incident", compact_incident(incident_data), 0),
+                ("description", incident_data.get("description"), 0),
+                ("rule_assessment", triage_hint.dict(exclude={"incident_id", "needs_llm"}) if triage_hint else None, 1),
+                ("related_entities", incident_data.get("related_entities"), 2)
+            ]),
             agent=rld_agents.triage_agent,
             expected_output="Incident classification, verified severity, investigation priorities, and relevant evidence sources"
         )
     
+    def batch_triage_task(self, incidents_data: List[dict]) -> Task:
+        """Create a task triaging several incidents with one JSON response"""
+        return Task(
+            description=build_batch_triage_prompt(incidents_data),
+            agent=rld_agents.triage_agent,
+            expected_output="JSON array with one triage result object per incident"
+        )
+    
     def collect_evidence_task(self, incident_data: dict, evidence_sources: list) -> Task:
         """Create a task for collecting evidence"""
-        sources_str = ", ".join(evidence_sources) if evidence_sources else "Not specified"
-        
+        builder = PromptBuilder(EVIDENCE_INSTRUCTIONS, settings.PROMPT_TOKEN_BUDGETS["evidence"])
         return Task(
-            description=f"""Collect evidence for the following revenue leakage incident:
-            
-            Incident Details:
-            ID: {incident_data.get('id', 'Unknown')}
-            Type: {incident_data.get('type', 'Unknown')}
-            Description: {incident_data.get('description', 'No description provided')}
-            
-            Relevant Evidence Sources:
-            {sources_str}
-            
-            Please:
-            1. Retrieve the specified evidence types
-            2. Organize the evidence in a structured format
-            3. Highlight any anomalies or inconsistencies found
-            4. Prepare the evidence for root cause analysis
-            
-            Include all relevant data points that would help with analysis.""",
+            description=builder.build([
+                ("incident", compact_incident(incident_data), 0),
+                ("description", incident_data.get("description"), 0),
+                ("evidence_sources", evidence_sources or "Not specified", 1),
+                ("related_entities", incident_data.get("related_entities"), 1)
+            ]),
             agent=rld_agents.evidence_collector_agent,
             expected_output="Structured collection of relevant evidence with anomalies highlighted"
         )
     
-    def root_cause_analysis_task(self, incident_data: dict, evidence: dict) -> Task:
+    def root_cause_analysis_task(self, incident_data: dict, evidence: dict, prior_fix: Optional[dict] = None) -> Task:
         """Create a task for root cause analysis"""
+        builder = PromptBuilder(RCA_INSTRUCTIONS, settings.PROMPT_TOKEN_BUDGETS["rca"])
+        fields = [
+            ("incident", compact_incident(incident_data), 0),
+            ("description", incident_data.get("description"), 0)
+        ]
+        if isinstance(evidence, dict) and "anomalies" in evidence:
+            # Bundle from the evidence collector: anomalies matter more than raw records
+            fields.append(("anomalies", evidence.get("anomalies"), 1))
+            fields.append(("records", evidence.get("records"), 3))
+        else:
+            fields.append(("evidence", evidence, 1))
+        if prior_fix:
+            fields.append(("similar_resolved_incident", {
+                "similarity": prior_fix.get("score"),
+                "root_cause": prior_fix["root_cause"],
+                "resolution": prior_fix["resolution"]
+            }, 2))
+        
         return Task(
-            description=f"""Perform root cause analysis for the following revenue leakage incident:
-            
-            Incident Details:
-            ID: {incident_data.get('id', 'Unknown')}
-            Type: {incident_data.get('type', 'Unknown')}
-            Description: {incident_data.get('description', 'No description provided')}
-            
-            Collected Evidence:
-            {str(evidence)[:1000]}...  # Truncate for readability
-            
-            Please:
-            1. Analyze the evidence to identify the root cause
-            2. Formulate 2-3 hypotheses about why this leakage occurred
-            3. For each hypothesis, explain the supporting evidence
-            4. Identify any systemic issues that might cause similar problems
-            5. Suggest preventive measures to avoid recurrence
-            
-            Return your analysis in JSON format with clear hypotheses and recommendations.""",
+            description=builder.build(fields),
             agent=rld_agents.rca_agent,
             expected_output="JSON-formatted root cause analysis with hypotheses and preventive measures"
         )
     
     def create_ticket_task(self, incident_data: dict, rca_results: dict) -> Task:
         """Create a task for creating investigation tickets"""
+        builder = PromptBuilder(TICKET_INSTRUCTIONS, settings.PROMPT_TOKEN_BUDGETS["ticket"])
         return Task(
-            description=f"""Create an investigation ticket for the following revenue leakage incident:
-            
-            Incident Details:
-            ID: {incident_data.get('id', 'Unknown')}
-            Type: {incident_data.get('type', 'Unknown')}
-            Severity: {incident_data.get('severity', 'Unknown')}
-            Description: {incident_data.get('description', 'No description provided')}
-            Financial Impact: {incident_data.get('financial_impact', 0)} {incident_data.get('currency', 'USD')}
-            
-            Root Cause Analysis Results:
-            {str(rca_results)[:1000]}...  # Truncate for readability
-            
-            Please:
-            1. Create a detailed ticket for investigation
-            2. Specify the assigned team or individual
-            3. Include all relevant information for resolution
-            4. Set appropriate priority based on severity and impact
-            5. Suggest next steps for resolution
-            6. Include links to related records and evidence
-            
-            Return the ticket details in a structured format.""",
+            description=builder.build([
+                ("incident", compact_incident(incident_data), 0),
+                ("description", incident_data.get("description"), 0),
+                ("root_cause_analysis", rca_results, 1),
+                ("related_entities", incident_data.get("related_entities"), 2),
+                ("evidence", incident_data.get("evidence"), 3)
+            ]),
             agent=rld_agents.ticket_creator_agent,
             expected_output="Detailed investigation ticket with assignment and resolution steps"
         )
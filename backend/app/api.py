@@ -1,8 +1,8 @@
 """
 FastAPI application for the Revenue Leakage Detection System
 """
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, UploadFile, File
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from typing import List, Optional
 from datetime import datetime
 import uvicorn
@@ -10,6 +10,11 @@ import uvicorn
 from app.models.data_models import Incident, BillingRecord, ProvisioningRecord, UsageRecord, Contract
 from app.models.detection_rules import run_all_rules
 from app.services.qdrant_client import qdrant_service
+from app.services.incident_clustering import cluster_incidents
+from app.services.contract_clauses import contract_clause_index
+from app.services.llm_metrics import llm_metrics
+from app.utils.columnar_io import DATASET_MODELS, columnar_format, read_records
+from app.config.settings import settings
 from app.agents.crew import rld_agents
 from app.agents.tasks import rld_tasks
 
@@ -38,6 +43,16 @@ class DetectionResponse(BaseModel):
     incidents: List[Incident]
     count: int
 
+class ContractIngestResponse(BaseModel):
+    """Response model for contract clause ingestion"""
+    contracts: int
+    chunks: int
+
+class ResolveIncidentRequest(BaseModel):
+    """Request model for resolving an incident"""
+    root_cause: str
+    resolution: str
+
 class IncidentResponse(BaseModel):
     """Response model for incident operations"""
     incident_id: str
@@ -55,6 +70,24 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+def detect_incidents(detection_data: dict) -> DetectionResponse:
+    """Run the detection rules on prepared data and store the incidents found"""
+    # Run all detection rules
+    incidents = run_all_rules(detection_data)
+    
+    # Collapse near-identical incidents so each distinct problem is stored once
+    if settings.INCIDENT_CLUSTERING_ENABLED:
+        incidents = cluster_incidents(incidents)
+    
+    # Store incidents in Qdrant
+    if incidents:
+        qdrant_service.upsert_incidents({incident.id: incident.dict() for incident in incidents})
+    
+    return DetectionResponse(
+        incidents=incidents,
+        count=len(incidents)
+    )
+
 @app.post("/detect", response_model=DetectionResponse)
 async def run_detection(request: DetectionRequest):
     """Run revenue leakage detection on provided data"""
@@ -65,18 +98,47 @@ async def run_detection(request: DetectionRequest):
         "usage": request.usage_records,
         "contracts": request.contracts
     }
-    
-    # Run all detection rules
-    incidents = run_all_rules(detection_data)
-    
-    # Store incidents in Qdrant
-    for incident in incidents:
-        qdrant_service.upsert_incident(incident.id, incident.dict())
-    
-    return DetectionResponse(
-        incidents=incidents,
-        count=len(incidents)
-    )
+    return detect_incidents(detection_data)
+
+@app.post("/detect/upload", response_model=DetectionResponse)
+async def run_detection_upload(
+    billing_file: Optional[UploadFile] = File(None),
+    provisioning_file: Optional[UploadFile] = File(None),
+    usage_file: Optional[UploadFile] = File(None),
+    contracts_file: Optional[UploadFile] = File(None)
+):
+    """
+    Run revenue leakage detection on uploaded files
+
+    Billing, provisioning and usage datasets are Parquet or Arrow IPC files
+    (format taken from the file name); contracts are a JSON array.
+    """
+    detection_data = {}
+    uploads = {"billing": billing_file, "provisioning": provisioning_file, "usage": usage_file}
+    for dataset, upload in uploads.items():
+        if upload is None:
+            detection_data[dataset] = []
+            continue
+        try:
+            file_format = columnar_format(upload.filename or "")
+            detection_data[dataset] = read_records(await upload.read(), DATASET_MODELS[dataset], file_format=file_format)
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid {dataset} file: {e}")
+
+    detection_data["contracts"] = []
+    if contracts_file is not None:
+        try:
+            detection_data["contracts"] = TypeAdapter(List[Contract]).validate_json(await contracts_file.read())
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid contracts file: {e}")
+
+    return detect_incidents(detection_data)
+
+@app.post("/contracts/ingest", response_model=ContractIngestResponse)
+async def ingest_contracts(contracts: List[Contract]):
+    """Index contract clauses for retrieval"""
+    chunks = contract_clause_index.ingest_contracts(contracts)
+    return ContractIngestResponse(contracts=len(contracts), chunks=chunks)
 
 @app.get("/incidents", response_model=List[Incident])
 async def list_incidents():
@@ -88,21 +150,37 @@ async def list_incidents():
 @app.get("/incidents/{incident_id}", response_model=Incident)
 async def get_incident(incident_id: str):
     """Get details of a specific incident"""
-    # In a real implementation, this would query Qdrant
-    # For now, returning a placeholder
-    return Incident(
-        id=incident_id,
-        type="missing_charge",
-        severity="high",
-        status="detected",
-        description=f"Sample incident {incident_id}",
-        financial_impact=0.0,
-        currency="USD",
-        detection_date=datetime.now(),
-        related_entities={},
-        created_at=datetime.now(),
-        updated_at=datetime.now()
+    incident_data = qdrant_service.get_incident(incident_id)
+    if incident_data is None:
+        raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+    return Incident(**incident_data)
+
+@app.post("/incidents/{incident_id}/resolve", response_model=IncidentResponse)
+async def resolve_incident(incident_id: str, request: ResolveIncidentRequest):
+    """Resolve an incident and add its fix to the knowledge base"""
+    incident_data = qdrant_service.get_incident(incident_id)
+    if incident_data is None:
+        raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+    
+    incident_data.update(
+        status="resolved",
+        root_cause=request.root_cause,
+        resolution=request.resolution,
+        updated_at=datetime.now().isoformat()
+    )
+    qdrant_service.upsert_incident(incident_id, incident_data)
+    qdrant_service.record_fix(incident_data)
+    
+    return IncidentResponse(
+        incident_id=incident_id,
+        status="resolved",
+        message="Incident resolved and its fix added to the knowledge base"
     )
 
+@app.get("/metrics/llm")
+async def get_llm_metrics():
+    """LLM call counts, tokens, cost and latency histograms per agent role and task type"""
+    return llm_metrics.snapshot()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -9,13 +9,104 @@ load_dotenv()
 
 class Settings:
     # Qdrant configuration
+    QDRANT_MODE = os.getenv("QDRANT_MODE", "server").lower()  # server, memory, local
+    QDRANT_PATH = os.getenv("QDRANT_PATH", "qdrant_data")
     QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
     QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "")
     QDRANT_USE_HTTPS = os.getenv("QDRANT_USE_HTTPS", "false").lower() == "true"
+    QDRANT_SEARCH_BATCH_SIZE = int(os.getenv("QDRANT_SEARCH_BATCH_SIZE", 256))
+    
+    # Embedding configuration
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "placeholder").lower()  # placeholder, gemini
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
+    EMBEDDING_SIZE = int(os.getenv("EMBEDDING_SIZE", 768))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+    
+    # Contract clause retrieval
+    CLAUSE_CHUNK_WORDS = int(os.getenv("CLAUSE_CHUNK_WORDS", 120))
+    CLAUSE_CHUNK_OVERLAP = int(os.getenv("CLAUSE_CHUNK_OVERLAP", 20))
+    SPARSE_AVG_DOC_LENGTH = float(os.getenv("SPARSE_AVG_DOC_LENGTH", 50))
+    HYBRID_PREFETCH_FACTOR = int(os.getenv("HYBRID_PREFETCH_FACTOR", 4))
+    
+    # Reindexing
+    REINDEX_PAGE_SIZE = int(os.getenv("REINDEX_PAGE_SIZE", 1000))
+    REINDEX_WORKERS = int(os.getenv("REINDEX_WORKERS", 8))
     
     # Gemini configuration
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 60))
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 8))
+    GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 60))
+    GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 4))
+    GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", 1.0))
+    GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", 30.0))
+    
+    # Incident store holding full incident records outside Qdrant
+    INCIDENT_STORE_PATH = os.getenv("INCIDENT_STORE_PATH", "incident_store.db")
+    
+    # Incident clustering
+    INCIDENT_CLUSTERING_ENABLED = os.getenv("INCIDENT_CLUSTERING_ENABLED", "false").lower() == "true"
+    INCIDENT_CLUSTER_THRESHOLD = float(os.getenv("INCIDENT_CLUSTER_THRESHOLD", 0.95))
+    
+    # Fast-path triage
+    TRIAGE_LLM_MIN_IMPACT = float(os.getenv("TRIAGE_LLM_MIN_IMPACT", 5000))
+    TRIAGE_REPEAT_INCIDENTS = int(os.getenv("TRIAGE_REPEAT_INCIDENTS", 3))
+    TRIAGE_HIGH_TIERS = [tier.strip().upper() for tier in os.getenv("TRIAGE_HIGH_TIERS", "ENTERPRISE,PREMIUM").split(",")]
+    
+    # Batched LLM triage
+    TRIAGE_BATCH_SIZE = int(os.getenv("TRIAGE_BATCH_SIZE", 20))
+    TRIAGE_BATCH_MAX_ATTEMPTS = int(os.getenv("TRIAGE_BATCH_MAX_ATTEMPTS", 3))
+    TRIAGE_BATCH_DESCRIPTION_CHARS = int(os.getenv("TRIAGE_BATCH_DESCRIPTION_CHARS", 200))
+    
+    # Evidence collection
+    EVIDENCE_MAX_RECORDS = int(os.getenv("EVIDENCE_MAX_RECORDS", 5))
+    
+    # Root cause reuse from kb_fixes
+    KB_REUSE_THRESHOLD = float(os.getenv("KB_REUSE_THRESHOLD", 0.95))
+    KB_HINT_THRESHOLD = float(os.getenv("KB_HINT_THRESHOLD", 0.8))
+    
+    # Prompt token budgets per agent task
+    PROMPT_TOKEN_BUDGETS = {
+        "triage": int(os.getenv("PROMPT_BUDGET_TRIAGE", 400)),
+        "evidence": int(os.getenv("PROMPT_BUDGET_EVIDENCE", 400)),
+        "rca": int(os.getenv("PROMPT_BUDGET_RCA", 1200)),
+        "ticket": int(os.getenv("PROMPT_BUDGET_TICKET", 1000))
+    }
+    
+    # Incident pipeline
+    PIPELINE_WORKERS_PER_STAGE = int(os.getenv("PIPELINE_WORKERS_PER_STAGE", 4))
+    PIPELINE_STATE_PATH = os.getenv("PIPELINE_STATE_PATH", "pipeline_state.jsonl")
+    
+    # LLM backend: gemini, or stub for offline runs with templated responses
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+    STUB_LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", 200))
+    STUB_LLM_OUTPUT_TOKENS = int(os.getenv("STUB_LLM_OUTPUT_TOKENS", 0))
+    
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+    LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    
+    # LLM call metrics
+    LLM_METRICS_LOG_PATH = os.getenv("LLM_METRICS_LOG_PATH", "llm_calls.jsonl")
+    LLM_INPUT_COST_PER_1K = float(os.getenv("LLM_INPUT_COST_PER_1K", 0.0005))
+    LLM_OUTPUT_COST_PER_1K = float(os.getenv("LLM_OUTPUT_COST_PER_1K", 0.0015))
+    
+    # OCR
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+    OCR_ZOOM = float(os.getenv("OCR_ZOOM", 2.0))
+    OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", 20))
+    OCR_MIN_TEXT_QUALITY = float(os.getenv("OCR_MIN_TEXT_QUALITY", 0.8))
+    OCR_TESSERACT_CONFIG = os.getenv("OCR_TESSERACT_CONFIG", "")
+    OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "ocr_cache.db")
+    OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+    
+    # Record file loaders
+    LOADER_BATCH_SIZE = int(os.getenv("LOADER_BATCH_SIZE", 10000))
     
     # Application settings
     APP_NAME = "RevenueLeakageDetection"
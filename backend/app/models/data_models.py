@@ -2,7 +2,7 @@
 Data models for the Revenue Leakage Detection System
 """
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 class BillingRecord(BaseModel):
@@ -60,6 +60,9 @@ class Contract(BaseModel):
     status: str  # active, expired, terminated
     clauses: List[ContractClause] = []
 
+# Incident severity levels, from least to most severe
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+
 class Incident(BaseModel):
     """Model for detected incidents"""
     id: str
@@ -72,7 +75,26 @@ class Incident(BaseModel):
     detection_date: datetime
     related_entities: Dict[str, str]  # References to related records
     evidence: List[str] = []  # References to evidence
+    member_ids: List[str] = []  # Incidents collapsed into this one by clustering
+    parent_id: Optional[str] = None  # Parent incident this one was collapsed into
     root_cause: Optional[str] = None
     resolution: Optional[str] = None
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+class TriageDecision(BaseModel):
+    """Outcome of rule-based incident triage"""
+    incident_id: str
+    severity: str  # low, medium, high, critical
+    priority: str  # P1 (most urgent) to P4
+    needs_llm: bool  # True if the incident should go to LLM triage
+    reasons: List[str] = []
+
+class BatchTriageResult(BaseModel):
+    """Per-incident result of batched LLM triage"""
+    id: str
+    severity: Literal["low", "medium", "high", "critical"]
+    priority: Literal["P1", "P2", "P3", "P4"]
+    classification_confirmed: bool
+    evidence_sources: List[str] = []
+    notes: str = ""
@@ -143,6 +143,8 @@ class IncorrectRateRule(DetectionRule):
                             detection_date=datetime.now(),
                             related_entities={
                                 "billing_id": bill.id,
+                                "customer_id": bill.customer_id,
+                                "service_id": bill.service_id,
                                 "contract_id": active_contract.id,
                                 "clause_id": rate_clause.id
                             },
@@ -205,6 +207,8 @@ class UsageMismatchRule(DetectionRule):
                     detection_date=datetime.now(),
                     related_entities={
                         "billing_id": bill.id,
+                        "customer_id": bill.customer_id,
+                        "service_id": bill.service_id,
                         "usage_date": str(bill.billing_date.date())
                     },
                     created_at=datetime.now(),
@@ -261,6 +265,8 @@ class DuplicateEntryRule(DetectionRule):
                         detection_date=datetime.now(),
                         related_entities={
                             "billing_id": duplicate.id,
+                            "customer_id": duplicate.customer_id,
+                            "service_id": duplicate.service_id,
                             "duplicate_of": records[0].id
                         },
                         created_at=datetime.now(),
@@ -0,0 +1,95 @@
+"""
+Rule-based fast-path triage for routine incidents
+"""
+from typing import Dict, Any, Optional
+from app.config.settings import settings
+from app.models.data_models import TriageDecision, SEVERITY_LEVELS
+
+# Severity assumed when an incident's financial impact is not yet known
+TYPE_BASE_SEVERITY = {
+    "missing_charge": "high",
+    "incorrect_rate": "medium",
+    "usage_mismatch": "low",
+    "duplicate_entry": "low"
+}
+
+# Upper financial impact bound for each severity; anything above is critical
+IMPACT_SEVERITY_BANDS = [
+    (50.0, "low"),
+    (500.0, "medium"),
+    (5000.0, "high")
+]
+
+SEVERITY_PRIORITY = {
+    "critical": "P1",
+    "high": "P2",
+    "medium": "P3",
+    "low": "P4"
+}
+
+def _raise_severity(severity: str, levels: int = 1) -> str:
+    """Move a severity up by ``levels``, capped at critical"""
+    index = min(SEVERITY_LEVELS.index(severity) + levels, len(SEVERITY_LEVELS) - 1)
+    return SEVERITY_LEVELS[index]
+
+def fast_triage(incident_data: Dict[str, Any], customer_tier: Optional[str] = None,
+                prior_incidents: int = 0) -> TriageDecision:
+    """
+    Assign severity and priority to an incident without the LLM
+    
+    Severity comes from the financial impact band (or the incident type when
+    the impact is unknown), raised one level for high-tier customers and one
+    for customers with repeated incidents. Incidents with an unknown type,
+    an impact at or above TRIAGE_LLM_MIN_IMPACT, a critical severity, or an
+    unknown impact for a high-tier or repeat customer are flagged for LLM
+    triage.
+    
+    Args:
+        incident_data: Incident as a dictionary
+        customer_tier: Customer plan tier (e.g. BASIC, ENTERPRISE), if known
+        prior_incidents: Number of earlier incidents for the same customer
+        
+    Returns:
+        TriageDecision for the incident
+    """
+    incident_type = incident_data.get("type")
+    impact = float(incident_data.get("financial_impact") or 0.0)
+    high_tier = bool(customer_tier) and customer_tier.upper() in settings.TRIAGE_HIGH_TIERS
+    repeat = prior_incidents >= settings.TRIAGE_REPEAT_INCIDENTS
+    reasons = []
+    needs_llm = False
+    
+    if incident_type not in TYPE_BASE_SEVERITY:
+        needs_llm = True
+        reasons.append(f"unrecognised incident type {incident_type}")
+    
+    if impact > 0:
+        severity = next((level for bound, level in IMPACT_SEVERITY_BANDS if impact < bound), "critical")
+        reasons.append(f"financial impact {impact:.2f}")
+    else:
+        severity = TYPE_BASE_SEVERITY.get(incident_type, "medium")
+        reasons.append("financial impact unknown, severity from incident type")
+        if high_tier or repeat:
+            needs_llm = True
+            reasons.append("unknown impact for a high-tier or repeat customer")
+    
+    if high_tier:
+        severity = _raise_severity(severity)
+        reasons.append(f"{customer_tier} customer")
+    if repeat:
+        severity = _raise_severity(severity)
+        reasons.append(f"{prior_incidents} prior incidents for customer")
+    
+    if impact >= settings.TRIAGE_LLM_MIN_IMPACT:
+        needs_llm = True
+        reasons.append("financial impact above LLM triage threshold")
+    if severity == "critical":
+        needs_llm = True
+    
+    return TriageDecision(
+        incident_id=incident_data.get("id", ""),
+        severity=severity,
+        priority=SEVERITY_PRIORITY[severity],
+        needs_llm=needs_llm,
+        reasons=reasons
+    )
@@ -0,0 +1,172 @@
+"""
+Contract clause ingestion and hybrid sparse + dense retrieval
+"""
+from collections import Counter
+from typing import List, Optional
+import re
+import uuid
+import zlib
+from qdrant_client.models import (
+    PointStruct, SparseVector, Prefetch, FusionQuery, Fusion,
+    Filter, FieldCondition, MatchValue, MatchAny, FilterSelector
+)
+from app.config.settings import settings
+from app.models.data_models import Contract
+from app.services.qdrant_client import qdrant_service
+
+COLLECTION_NAME = "contract_clauses"
+
+# BM25 term frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Keeps plan IDs (plan-basic), amounts (299.99) and dates (2023-06-01) as single terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _term_index(term: str) -> int:
+    """Stable sparse vector index for a term"""
+    return zlib.crc32(term.encode("utf-8"))
+
+def encode_sparse_document(text: str) -> SparseVector:
+    """Encode a document as BM25 term weights (IDF is applied by Qdrant)"""
+    terms = tokenize(text)
+    length_norm = 1 - BM25_B + BM25_B * len(terms) / settings.SPARSE_AVG_DOC_LENGTH
+    weights = {}
+    for term, tf in Counter(terms).items():
+        index = _term_index(term)
+        weights[index] = weights.get(index, 0.0) + tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+    return SparseVector(indices=list(weights), values=list(weights.values()))
+
+def encode_sparse_query(text: str) -> SparseVector:
+    """Encode a query as a set of terms"""
+    indices = sorted({_term_index(term) for term in tokenize(text)})
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+def chunk_text(text: str, chunk_words: Optional[int] = None, overlap_words: Optional[int] = None) -> List[str]:
+    """Split text into overlapping word windows"""
+    chunk_words = chunk_words or settings.CLAUSE_CHUNK_WORDS
+    overlap_words = settings.CLAUSE_CHUNK_OVERLAP if overlap_words is None else overlap_words
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [text] if words else []
+
+    step = max(chunk_words - overlap_words, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+def clause_vectors(text: str, embedding: list) -> dict:
+    """Named dense and sparse vectors for a clause chunk"""
+    return {"dense": embedding, "sparse": encode_sparse_document(text)}
+
+class ContractClauseIndex:
+    """Ingest contract clauses into Qdrant and search them"""
+
+    def __init__(self):
+        """Use the shared Qdrant service"""
+        self.client = qdrant_service.client
+
+    def ingest_contracts(self, contracts: List[Contract]) -> int:
+        """
+        Chunk, embed and upsert the clauses of the given contracts
+
+        Existing chunks of these contracts are replaced, so re-ingesting an
+        amended contract does not leave stale clause text behind.
+
+        Args:
+            contracts: Contracts whose clauses should be indexed
+
+        Returns:
+            Number of clause chunks stored
+        """
+        if not contracts:
+            return 0
+
+        payloads = []
+        for contract in contracts:
+            for clause in contract.clauses:
+                for chunk_index, chunk in enumerate(chunk_text(clause.content)):
+                    payloads.append({
+                        "contract_id": clause.contract_id,
+                        "customer_id": contract.customer_id,
+                        "clause_id": clause.id,
+                        "clause_type": clause.clause_type,
+                        "chunk_index": chunk_index,
+                        "content": chunk
+                    })
+
+        self.client.delete(
+            collection_name=COLLECTION_NAME,
+            points_selector=FilterSelector(filter=Filter(must=[
+                FieldCondition(key="contract_id", match=MatchAny(any=[contract.id for contract in contracts]))
+            ]))
+        )
+
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        for start in range(0, len(payloads), batch_size):
+            batch = payloads[start:start + batch_size]
+            embeddings = qdrant_service.generate_embeddings([payload["content"] for payload in batch])
+            points = [
+                PointStruct(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{payload['clause_id']}:{payload['chunk_index']}")),
+                    vector=clause_vectors(payload["content"], embedding),
+                    payload=payload
+                )
+                for payload, embedding in zip(batch, embeddings)
+            ]
+            self.client.upsert(collection_name=COLLECTION_NAME, points=points)
+
+        return len(payloads)
+
+    def search(self, query: str, contract_id: Optional[str] = None, clause_type: Optional[str] = None,
+               limit: int = 5) -> list:
+        """
+        Hybrid search over contract clauses
+
+        Dense (semantic) and sparse (BM25) candidates are fused with
+        reciprocal rank fusion, so exact terms such as plan IDs and rate
+        figures rank highly even when the embedding does not capture them.
+
+        Args:
+            query: Free-text query
+            contract_id: Restrict results to one contract
+            clause_type: Restrict results to one clause type (rate, penalty, ...)
+            limit: Number of clause chunks to return
+
+        Returns:
+            List of scored points with clause payloads
+        """
+        conditions = []
+        if contract_id:
+            conditions.append(FieldCondition(key="contract_id", match=MatchValue(value=contract_id)))
+        if clause_type:
+            conditions.append(FieldCondition(key="clause_type", match=MatchValue(value=clause_type)))
+        query_filter = Filter(must=conditions) if conditions else None
+
+        dense_query = qdrant_service.generate_embeddings([query])[0]
+        candidates = limit * settings.HYBRID_PREFETCH_FACTOR
+        try:
+            response = self.client.query_points(
+                collection_name=COLLECTION_NAME,
+                prefetch=[
+                    Prefetch(query=dense_query, using="dense", filter=query_filter, limit=candidates),
+                    Prefetch(query=encode_sparse_query(query), using="sparse", filter=query_filter, limit=candidates)
+                ],
+                query=FusionQuery(fusion=Fusion.RRF),
+                limit=limit,
+                with_payload=True
+            )
+            return response.points
+        except Exception as e:
+            print(f"Error searching contract clauses: {e}")
+            return []
+
+# Global instance
+contract_clause_index = ContractClauseIndex()
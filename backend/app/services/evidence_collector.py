@@ -0,0 +1,144 @@
+"""
+Deterministic evidence collection from indexed record stores
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+import re
+from app.config.settings import settings
+from app.models.data_models import BillingRecord, ProvisioningRecord, UsageRecord, Contract
+
+# Fields kept from each record type in an evidence bundle
+EVIDENCE_FIELDS = {
+    "billing": ["id", "invoice_id", "customer_id", "service_id", "amount", "currency",
+                "billing_date", "billing_period_start", "billing_period_end", "status"],
+    "provisioning": ["id", "customer_id", "service_id", "plan_id", "status", "start_date", "end_date"],
+    "contract": ["id", "customer_id", "status", "effective_date", "expiry_date"],
+    "clause": ["id", "contract_id", "clause_type", "content"]
+}
+
+RATE_PATTERN = re.compile(r"\$\s?([\d,]+(?:\.\d+)?)")
+
+def parse_rate(content: str) -> Optional[float]:
+    """First currency amount in a rate clause, if any"""
+    match = RATE_PATTERN.search(content or "")
+    return float(match.group(1).replace(",", "")) if match else None
+
+def compact_record(record, kind: str) -> dict:
+    """Selected fields of a record with dates as ISO date strings"""
+    compact = {}
+    for field in EVIDENCE_FIELDS[kind]:
+        value = getattr(record, field, None)
+        if value is None:
+            continue
+        compact[field] = value.date().isoformat() if hasattr(value, "date") else value
+    return compact
+
+class RecordIndex:
+    """In-memory indexes over the records a detection run was given"""
+
+    def __init__(self, billing: Iterable[BillingRecord] = (), provisioning: Iterable[ProvisioningRecord] = (),
+                 usage: Iterable[UsageRecord] = (), contracts: Iterable[Contract] = ()):
+        """Build ID and (customer, service) indexes"""
+        self.billing = {record.id: record for record in billing}
+        self.provisioning = {record.id: record for record in provisioning}
+        self.contracts = {contract.id: contract for contract in contracts}
+        self.clauses = {
+            clause.id: clause
+            for contract in self.contracts.values()
+            for clause in contract.clauses
+        }
+
+        self.billing_by_service = defaultdict(list)
+        for record in self.billing.values():
+            self.billing_by_service[(record.customer_id, record.service_id)].append(record)
+
+        self.usage_by_service_date = defaultdict(float)
+        for record in usage:
+            self.usage_by_service_date[(record.customer_id, record.service_id, record.usage_date.date())] += record.quantity
+
+class EvidenceCollector:
+    """Resolve incident related entities into compact evidence bundles"""
+
+    def __init__(self, record_index: RecordIndex, max_records: Optional[int] = None):
+        """
+        Args:
+            record_index: Indexed records to resolve entities against
+            max_records: Cap on related records listed per type (defaults to EVIDENCE_MAX_RECORDS)
+        """
+        self.index = record_index
+        self.max_records = max_records or settings.EVIDENCE_MAX_RECORDS
+
+    def collect(self, incident_data: dict) -> Dict[str, Any]:
+        """
+        Build the evidence bundle for an incident
+
+        Resolves billing_id, provisioning_id, contract_id, clause_id and
+        duplicate_of from ``related_entities`` and highlights anomalies
+        between the resolved records.
+
+        Returns:
+            Dictionary with ``incident_id``, ``type``, resolved ``records``
+            and a list of ``anomalies``
+        """
+        entities = incident_data.get("related_entities") or {}
+        records = {}
+        anomalies = []
+
+        def resolve(kind: str, store: dict, entity: str):
+            record_id = entities.get(entity)
+            if not record_id:
+                return None
+            record = store.get(record_id)
+            if record is None:
+                anomalies.append(f"{entity} {record_id} not found in {kind} records")
+                return None
+            records[entity.replace("_id", "")] = compact_record(record, kind)
+            return record
+
+        bill = resolve("billing", self.index.billing, "billing_id")
+        provision = resolve("provisioning", self.index.provisioning, "provisioning_id")
+        resolve("contract", self.index.contracts, "contract_id")
+        clause = resolve("clause", self.index.clauses, "clause_id")
+        original = resolve("billing", self.index.billing, "duplicate_of")
+
+        if provision is not None:
+            bills = self.index.billing_by_service.get((provision.customer_id, provision.service_id), [])
+            records["service_bills"] = [compact_record(record, "billing") for record in bills[:self.max_records]]
+            covering = [
+                record for record in bills
+                if record.billing_period_start.date() <= provision.start_date.date() <= record.billing_period_end.date()
+            ]
+            if not covering:
+                anomalies.append(
+                    f"No bill for {provision.service_id} covers provision start {provision.start_date.date()} "
+                    f"({len(bills)} bills for this customer and service)"
+                )
+
+        if bill is not None and clause is not None:
+            rate = parse_rate(clause.content)
+            if rate is None:
+                anomalies.append(f"Rate clause {clause.id} has no parseable rate")
+            elif abs(bill.amount - rate) > 1.0:
+                anomalies.append(f"Billed {bill.amount:.2f} vs contract rate {rate:.2f} (difference {bill.amount - rate:+.2f})")
+
+        if bill is not None and incident_data.get("type") == "usage_mismatch":
+            usage = self.index.usage_by_service_date.get((bill.customer_id, bill.service_id, bill.billing_date.date()), 0.0)
+            records["usage_total"] = round(usage, 2)
+            anomalies.append(f"Billed {bill.amount:.2f} vs {usage:.2f} usage units on {bill.billing_date.date()}")
+
+        if bill is not None and original is not None:
+            anomalies.append(
+                f"Invoices {original.invoice_id} and {bill.invoice_id} bill {bill.amount:.2f} "
+                f"for the same period {bill.billing_period_start.date()} to {bill.billing_period_end.date()}"
+            )
+
+        return {
+            "incident_id": incident_data.get("id"),
+            "type": incident_data.get("type"),
+            "records": records,
+            "anomalies": anomalies
+        }
+
+    def collect_many(self, incidents_data: List[dict]) -> Dict[str, Dict[str, Any]]:
+        """Evidence bundles for several incidents, by incident ID"""
+        return {incident_data.get("id"): self.collect(incident_data) for incident_data in incidents_data}
@@ -1,47 +1,240 @@
 """
 Gemini client for LLM operations
 """
+from typing import Optional, Tuple, Any, List
+import asyncio
+import logging
+import random
+import time
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from app.config.settings import settings
+from app.services.llm_cache import llm_cache, LLMResponseCache
+from app.services.llm_metrics import llm_metrics, usage_tokens
+from app.services.rate_limiter import TokenBucket
+from app.services.stub_llm import StubGenerativeModel
+from app.agents.prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Metric tags for calls made outside an agent task
+DEFAULT_AGENT_ROLE = "gemini_client"
+DEFAULT_TASK_TYPE = "generic"
+
+# Errors worth retrying: quota, transient server failures and timeouts
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded
+)
 
 class GeminiClient:
-    def __init__(self):
-        """Initialize Gemini client"""
-        if settings.GEMINI_API_KEY:
+    def __init__(self, model_name: str = 'gemini-pro', model: Any = None):
+        """
+        Initialize Gemini client
+        
+        ``model`` can be any object with Gemini's ``generate_content``
+        interface, e.g. a local stub used in tests and benchmarks. With
+        LLM_BACKEND=stub the offline stub model is used and responses are
+        cached under a separate model name.
+        """
+        self.model_name = model_name
+        if model is not None:
+            self.model = model
+        elif settings.LLM_BACKEND == "stub":
+            self.model_name = f"stub-{model_name}"
+            self.model = StubGenerativeModel()
+        elif settings.GEMINI_API_KEY:
             genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.model = genai.GenerativeModel(model_name)
         else:
             self.model = None
+        
+        self.cache = llm_cache if settings.LLM_CACHE_ENABLED else None
+        self.rate_limiter = TokenBucket(settings.GEMINI_REQUESTS_PER_MINUTE / 60.0)
+    
+    @staticmethod
+    def _usage(prompt: str, text: str, response: Any = None) -> dict:
+        """Token counts of a call, estimated where the response does not report them"""
+        input_tokens, output_tokens = usage_tokens(response)
+        return {
+            "input_tokens": input_tokens or estimate_tokens(prompt),
+            "output_tokens": output_tokens or estimate_tokens(text)
+        }
+    
+    def _generate(self, prompt: str, generation_config: Optional[dict] = None,
+                  agent_role: str = DEFAULT_AGENT_ROLE, task_type: str = DEFAULT_TASK_TYPE) -> Tuple[str, Any]:
+        """
+        Generate a response, serving repeated prompts from the response cache
+        
+        The call is recorded in the LLM metrics under ``agent_role`` and
+        ``task_type``. Returns the response text and the raw response (None
+        on a cache hit).
+        """
+        with llm_metrics.track(agent_role, task_type, self.model_name) as call:
+            key = None
+            if self.cache:
+                key = LLMResponseCache.make_key(self.model_name, prompt, generation_config)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    call.update(self._usage(prompt, cached), cache_hit=True)
+                    return cached, None
+            
+            self.rate_limiter.wait()
+            response = self.model.generate_content(prompt, generation_config=generation_config)
+            if self.cache:
+                self.cache.set(key, response.text)
+            call.update(self._usage(prompt, response.text, response))
+            return response.text, response
+    
+    async def _generate_async(self, prompt: str, generation_config: Optional[dict] = None,
+                              use_cache: bool = True, timeout: Optional[float] = None) -> Tuple[str, Any]:
+        """
+        Async counterpart of ``_generate``, without metrics
+        
+        With ``use_cache`` off the cache is not read, but the fresh response
+        still replaces the cached one. ``timeout`` applies to the model call
+        only, not to the wait for a rate limit token. Cache reads and writes
+        run in the default executor so they don't block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        key = None
+        if self.cache:
+            key = LLMResponseCache.make_key(self.model_name, prompt, generation_config)
+        if self.cache and use_cache:
+            cached = await loop.run_in_executor(None, self.cache.get, key)
+            if cached is not None:
+                return cached, None
+        
+        await self.rate_limiter.acquire()
+        if hasattr(self.model, "generate_content_async"):
+            call = self.model.generate_content_async(prompt, generation_config=generation_config)
+        else:
+            call = loop.run_in_executor(
+                None, lambda: self.model.generate_content(prompt, generation_config=generation_config)
+            )
+        response = await asyncio.wait_for(call, timeout)
+        if self.cache:
+            await loop.run_in_executor(None, self.cache.set, key, response.text)
+        return response.text, response
+    
+    async def _generate_with_retries(self, prompt: str, generation_config: Optional[dict],
+                                     timeout: float, max_retries: int,
+                                     agent_role: str, task_type: str, use_cache: bool = True) -> dict:
+        """
+        Generate one response with a timeout and exponential backoff with full jitter
+        
+        The prompt is recorded in the LLM metrics once, with its total
+        latency including backoff and the number of retries it took.
+        """
+        start = time.perf_counter()
+        
+        def record(status: str, retries: int, usage: Optional[dict] = None, cache_hit: bool = False,
+                   error: Optional[str] = None):
+            llm_metrics.record(agent_role, task_type, self.model_name, time.perf_counter() - start,
+                               cache_hit=cache_hit, retries=retries, status=status, error=error, **(usage or {}))
+        
+        for attempt in range(max_retries + 1):
+            try:
+                text, response = await self._generate_async(prompt, generation_config, use_cache, timeout)
+                record("success", attempt, self._usage(prompt, text, response), cache_hit=response is None)
+                return {"status": "success", "content": text}
+            except RETRYABLE_ERRORS as e:
+                message = f"{type(e).__name__}: {e}"
+                if attempt == max_retries:
+                    logger.warning("Gemini request failed after %d retries: %s", attempt, message)
+                    record("error", attempt, error=message)
+                    return {"status": "error", "message": message}
+                backoff = min(settings.GEMINI_BACKOFF_MAX_SECONDS, settings.GEMINI_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                await asyncio.sleep(random.uniform(0, backoff))
+            except Exception as e:
+                message = f"{type(e).__name__}: {e}"
+                logger.warning("Gemini request failed: %s", message)
+                record("error", attempt, error=message)
+                return {"status": "error", "message": message}
+    
+    async def generate_batch(self, prompts: List[str], generation_config: Optional[dict] = None,
+                             max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                             max_retries: Optional[int] = None, agent_role: str = DEFAULT_AGENT_ROLE,
+                             task_type: str = DEFAULT_TASK_TYPE, use_cache: bool = True) -> List[dict]:
+        """
+        Generate responses for many prompts concurrently
+        
+        At most ``max_concurrency`` requests are in flight and requests are
+        paced by the client's token bucket (GEMINI_REQUESTS_PER_MINUTE).
+        Retryable errors are retried with exponential backoff and jitter.
+        
+        Args:
+            prompts: Prompts to run
+            generation_config: Generation parameters applied to every prompt
+            max_concurrency: Concurrent requests (defaults to GEMINI_MAX_CONCURRENCY)
+            timeout: Per-attempt model call timeout in seconds, not counting
+                the wait for a rate limit token (defaults to GEMINI_TIMEOUT_SECONDS)
+            max_retries: Retries per prompt (defaults to GEMINI_MAX_RETRIES)
+            agent_role: Agent role the calls are recorded under in the LLM metrics
+            task_type: Task type the calls are recorded under in the LLM metrics
+            use_cache: Serve prompts from the response cache; turn off to
+                get fresh responses, e.g. when retrying unusable ones
+            
+        Returns:
+            One result per prompt, in input order: ``{"status": "success", "content": ...}``
+            or ``{"status": "error", "message": ...}``
+        """
+        if not self.model:
+            return [{"status": "error", "message": "Gemini API key not configured"} for _ in prompts]
+        
+        timeout = timeout or settings.GEMINI_TIMEOUT_SECONDS
+        max_retries = settings.GEMINI_MAX_RETRIES if max_retries is None else max_retries
+        semaphore = asyncio.Semaphore(max_concurrency or settings.GEMINI_MAX_CONCURRENCY)
+        
+        async def run(prompt: str) -> dict:
+            async with semaphore:
+                return await self._generate_with_retries(
+                    prompt, generation_config, timeout, max_retries, agent_role, task_type, use_cache
+                )
+        
+        return await asyncio.gather(*(run(prompt) for prompt in prompts))
+    
+    def invalidate(self, prompt: str, generation_config: Optional[dict] = None):
+        """Drop the cached response for a prompt, e.g. one that failed to parse"""
+        if self.cache:
+            self.cache.delete(LLMResponseCache.make_key(self.model_name, prompt, generation_config))
     
-    def generate_text(self, prompt: str) -> str:
+    def generate_text(self, prompt: str, generation_config: Optional[dict] = None,
+                      agent_role: str = DEFAULT_AGENT_ROLE, task_type: str = DEFAULT_TASK_TYPE) -> str:
         """Generate text using Gemini"""
         if not self.model:
             return "Gemini API key not configured. This is a placeholder response."
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            text, _ = self._generate(prompt, generation_config, agent_role, task_type)
+            return text
         except Exception as e:
-            print(f"Error generating text with Gemini: {e}")
+            logger.error("Error generating text with Gemini: %s", e)
             return "Error generating response"
     
-    def generate_json(self, prompt: str) -> dict:
+    def generate_json(self, prompt: str, generation_config: Optional[dict] = None,
+                      agent_role: str = DEFAULT_AGENT_ROLE, task_type: str = DEFAULT_TASK_TYPE) -> dict:
         """Generate JSON response using Gemini"""
         if not self.model:
             return {"status": "error", "message": "Gemini API key not configured"}
         
         try:
-            response = self.model.generate_content(prompt)
+            text, response = self._generate(prompt, generation_config, agent_role, task_type)
             # In a real implementation, you would parse the response as JSON
             # For now, returning a mock structure
             return {
                 "status": "success",
-                "content": response.text,
+                "content": text,
                 "raw_response": response
             }
         except Exception as e:
-            print(f"Error generating JSON with Gemini: {e}")
+            logger.error("Error generating JSON with Gemini: %s", e)
             return {"status": "error", "message": str(e)}
 
 # Global instance
-gemini_client = GeminiClient()
\ No newline at end of file
+gemini_client = GeminiClient()
@@ -0,0 +1,125 @@
+"""
+Similarity clustering to collapse near-identical incidents before storage
+"""
+from typing import List, Optional
+from datetime import datetime
+import uuid
+import numpy as np
+from app.config.settings import settings
+from app.models.data_models import Incident, SEVERITY_LEVELS
+from app.services.qdrant_client import qdrant_service
+from app.services.incident_store import incident_store
+
+# Related entities that must match for incidents of each type to be grouped
+# together. Entities unique to every incident (such as billing_id) are left
+# out, otherwise nothing would ever be grouped.
+CLUSTER_KEY_ENTITIES = {
+    "missing_charge": ("customer_id", "service_id"),
+    "incorrect_rate": ("customer_id", "service_id", "contract_id", "clause_id"),
+    "usage_mismatch": ("customer_id", "service_id", "usage_date"),
+    "duplicate_entry": ("customer_id", "service_id", "duplicate_of")
+}
+DEFAULT_CLUSTER_KEY_ENTITIES = ("customer_id", "service_id", "contract_id")
+
+def _group_key(incident: Incident) -> tuple:
+    """Key that candidate cluster members must share"""
+    entities = CLUSTER_KEY_ENTITIES.get(incident.type, DEFAULT_CLUSTER_KEY_ENTITIES)
+    return (incident.type,) + tuple(
+        incident.related_entities.get(entity) for entity in entities
+    )
+
+def _shared_entities(members: List[Incident]) -> dict:
+    """Related entities with the same value in every member"""
+    shared = dict(members[0].related_entities)
+    for member in members[1:]:
+        shared = {
+            entity: value for entity, value in shared.items()
+            if member.related_entities.get(entity) == value
+        }
+    return shared
+
+def _make_parent(members: List[Incident]) -> Incident:
+    """
+    Create a parent incident standing in for a cluster of members
+    
+    The parent keeps only the related entities all members share; the
+    members themselves are stored with a ``parent_id`` reference.
+    """
+    if len(members) == 1:
+        return members[0]
+    
+    lead = members[0]
+    severity = max((member.severity for member in members), key=lambda s: SEVERITY_LEVELS.index(s) if s in SEVERITY_LEVELS else -1)
+    return lead.copy(update={
+        "id": str(uuid.uuid4()),
+        "severity": severity,
+        "description": f"{lead.description} ({len(members)} similar incidents)",
+        "related_entities": _shared_entities(members),
+        "financial_impact": sum(member.financial_impact for member in members),
+        "member_ids": [member.id for member in members],
+        "updated_at": datetime.now()
+    })
+
+def cluster_incidents(incidents: List[Incident], threshold: Optional[float] = None) -> List[Incident]:
+    """
+    Collapse near-identical incidents into parent incidents
+    
+    Incidents are grouped by type and the key related entities of that type
+    (CLUSTER_KEY_ENTITIES), including the customer, then clustered
+    within each group by cosine similarity of their description embeddings.
+    Each incident joins the first cluster whose leader is at least
+    ``threshold`` similar, otherwise it starts a new cluster.
+    
+    Args:
+        incidents: Incidents produced by the detection rules
+        threshold: Cosine similarity needed to join a cluster
+            (defaults to INCIDENT_CLUSTER_THRESHOLD)
+        
+    Returns:
+        One incident per cluster; clusters with several members are
+        replaced by a parent incident referencing them in ``member_ids``,
+        and the members are written to the incident store
+    """
+    threshold = settings.INCIDENT_CLUSTER_THRESHOLD if threshold is None else threshold
+    
+    groups = {}
+    for incident in incidents:
+        groups.setdefault(_group_key(incident), []).append(incident)
+    
+    parents = []
+    for members in groups.values():
+        if len(members) == 1:
+            parents.append(members[0])
+            continue
+        
+        embeddings = np.asarray(
+            qdrant_service.generate_embeddings([member.description for member in members]),
+            dtype=np.float32
+        )
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
+        
+        leaders = np.empty_like(embeddings)
+        clusters = []
+        for index, member in enumerate(members):
+            if clusters:
+                scores = leaders[:len(clusters)] @ embeddings[index]
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    clusters[best].append(member)
+                    continue
+            leaders[len(clusters)] = embeddings[index]
+            clusters.append([member])
+        
+        for cluster in clusters:
+            parent = _make_parent(cluster)
+            if parent.member_ids:
+                # Members stay retrievable by ID, pointing back at their parent
+                incident_store.put_many({
+                    member.id: member.copy(update={"parent_id": parent.id}).dict()
+                    for member in cluster
+                })
+            parents.append(parent)
+    
+    return parents
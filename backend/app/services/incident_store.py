@@ -0,0 +1,70 @@
+"""
+Local side store for incident details kept out of the vector store
+"""
+from typing import Dict, List, Optional
+import json
+import os
+import sqlite3
+import threading
+from app.config.settings import settings
+
+class IncidentStore:
+    """SQLite store holding full incident records keyed by incident ID"""
+
+    def __init__(self, path: Optional[str] = None):
+        """Set up the store; the database is opened on first use"""
+        self.path = path or settings.INCIDENT_STORE_PATH
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection for the current process (caller holds the lock)"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS incidents (id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def put_many(self, incidents: Dict[str, dict]):
+        """Store or replace several incident records"""
+        rows = [
+            (incident_id, json.dumps(data, default=str))
+            for incident_id, data in incidents.items()
+        ]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO incidents (id, data) VALUES (?, ?)", rows
+            )
+            conn.commit()
+
+    def put(self, incident_id: str, data: dict):
+        """Store or replace an incident record"""
+        self.put_many({incident_id: data})
+
+    def get_many(self, incident_ids: List[str]) -> Dict[str, dict]:
+        """Fetch incident records by ID, skipping unknown IDs"""
+        results = {}
+        with self._lock:
+            conn = self._connection()
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(incident_ids), 500):
+                chunk = incident_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT id, data FROM incidents WHERE id IN ({placeholders})", chunk
+                ).fetchall()
+                results.update((row[0], json.loads(row[1])) for row in rows)
+        return results
+
+    def get(self, incident_id: str) -> Optional[dict]:
+        """Fetch an incident record by ID"""
+        return self.get_many([incident_id]).get(incident_id)
+
+# Global instance
+incident_store = IncidentStore()
@@ -0,0 +1,39 @@
+"""
+Disk-backed cache of LLM responses
+"""
+from typing import Optional
+import hashlib
+from app.config.settings import settings
+from app.utils.sqlite_cache import SQLiteLRUCache
+
+class LLMResponseCache(SQLiteLRUCache):
+    """SQLite cache of LLM responses with TTL and size-based LRU eviction"""
+
+    table = "responses"
+    value_column = "response"
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        """Set up the cache; the database is opened on first use"""
+        super().__init__(
+            path or settings.LLM_CACHE_PATH,
+            max_bytes=settings.LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Optional[dict] = None) -> str:
+        """Cache key for a model, prompt and generation parameters"""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return SQLiteLRUCache.hash_key(model=model, prompt=prompt_hash, params=params or {})
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key``, or None if missing or expired"""
+        return self.get_text(key)
+
+    def set(self, key: str, response: str):
+        """Store a response, evicting least recently used entries if over size"""
+        self.set_text(key, response)
+
+# Global instance
+llm_cache = LLMResponseCache()
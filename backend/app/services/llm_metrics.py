@@ -0,0 +1,145 @@
+"""
+Instrumentation of LLM calls: latency, tokens, cache hits, retries and cost
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import json
+import threading
+import time
+from app.config.settings import settings
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf")]
+
+# USD per 1K input and output tokens, used for cost estimates
+MODEL_PRICING = {
+    "gemini-pro": (0.0005, 0.0015),
+    "gemini-1.5-pro": (0.00125, 0.005),
+    "gemini-1.5-flash": (0.000075, 0.0003)
+}
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of a call"""
+    input_price, output_price = MODEL_PRICING.get(
+        model, (settings.LLM_INPUT_COST_PER_1K, settings.LLM_OUTPUT_COST_PER_1K)
+    )
+    return (input_tokens * input_price + output_tokens * output_price) / 1000.0
+
+def usage_tokens(response: Any) -> tuple:
+    """Input and output token counts reported in a Gemini response, if any"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+class LLMMetrics:
+    """Aggregate LLM call metrics per agent role and task type and log each call"""
+
+    def __init__(self, log_path: Optional[str] = None):
+        """
+        Args:
+            log_path: JSON lines file receiving one record per call
+                (defaults to LLM_METRICS_LOG_PATH; empty disables the log)
+        """
+        self.log_path = settings.LLM_METRICS_LOG_PATH if log_path is None else log_path
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, agent_role: str, task_type: str, model: str, latency_seconds: float,
+               input_tokens: int = 0, output_tokens: int = 0, cache_hit: bool = False,
+               retries: int = 0, status: str = "success", error: Optional[str] = None):
+        """Record one LLM call"""
+        input_tokens = input_tokens or 0
+        output_tokens = output_tokens or 0
+        cost = 0.0 if cache_hit else estimate_cost(model, input_tokens, output_tokens)
+        entry = {
+            "timestamp": time.time(),
+            "agent_role": agent_role,
+            "task_type": task_type,
+            "model": model,
+            "latency_seconds": round(latency_seconds, 6),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_hit": cache_hit,
+            "retries": retries,
+            "cost_usd": round(cost, 6),
+            "status": status
+        }
+        if error:
+            entry["error"] = error
+
+        with self._lock:
+            stats = self._stats.setdefault((agent_role, task_type), {
+                "calls": 0, "errors": 0, "cache_hits": 0, "retries": 0,
+                "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+                "latency_total_seconds": 0.0,
+                "latency_histogram": [0] * len(LATENCY_BUCKETS)
+            })
+            stats["calls"] += 1
+            stats["errors"] += status != "success"
+            stats["cache_hits"] += cache_hit
+            stats["retries"] += retries
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost_usd"] += cost
+            stats["latency_total_seconds"] += latency_seconds
+            stats["latency_histogram"][bisect_left(LATENCY_BUCKETS, latency_seconds)] += 1
+
+            if self.log_path:
+                with open(self.log_path, "a") as log_file:
+                    log_file.write(json.dumps(entry) + "\n")
+
+    @contextmanager
+    def track(self, agent_role: str, task_type: str, model: str):
+        """
+        Time a call and record it on exit
+
+        Yields a dictionary the caller fills with ``input_tokens``,
+        ``output_tokens``, ``cache_hit`` and ``retries``. Exceptions are
+        recorded as errors and re-raised.
+        """
+        call = {}
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception as e:
+            self.record(agent_role, task_type, model, time.perf_counter() - start,
+                        status="error", error=f"{type(e).__name__}: {e}", **call)
+            raise
+        self.record(agent_role, task_type, model, time.perf_counter() - start, **call)
+
+    @staticmethod
+    def _percentile(histogram: list, calls: int, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of calls"""
+        threshold = calls * fraction
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Aggregated metrics per agent role and task type"""
+        with self._lock:
+            stages = []
+            for (agent_role, task_type), stats in sorted(self._stats.items()):
+                calls = stats["calls"]
+                stages.append({
+                    "agent_role": agent_role,
+                    "task_type": task_type,
+                    **{key: value for key, value in stats.items() if key != "latency_histogram"},
+                    "cost_usd": round(stats["cost_usd"], 6),
+                    "latency_mean_seconds": stats["latency_total_seconds"] / calls,
+                    "latency_p50_seconds": self._percentile(stats["latency_histogram"], calls, 0.5),
+                    "latency_p95_seconds": self._percentile(stats["latency_histogram"], calls, 0.95),
+                    "latency_histogram": {
+                        ("+Inf" if bound == float("inf") else str(bound)): count
+                        for bound, count in zip(LATENCY_BUCKETS, stats["latency_histogram"])
+                    }
+                })
+        return {"stages": stages}
+
+# Global instance
+llm_metrics = LLMMetrics()
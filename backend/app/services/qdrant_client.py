@@ -2,30 +2,191 @@
 Qdrant client integration for vector storage
 """
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, QueryRequest, PayloadSchemaType,
+    SparseVectorParams, Modifier, Filter, FieldCondition, MatchValue,
+    CreateAlias, CreateAliasOperation
+)
 from app.config.settings import settings
+from app.services.incident_store import incident_store
+from typing import List, Optional, Dict
+from collections import OrderedDict
+from datetime import datetime
+import threading
 import google.generativeai as genai
 
+_embedded_clients = {}
+
+# Collections using named dense + sparse vectors for hybrid search
+HYBRID_COLLECTIONS = {"contract_clauses"}
+
+# Indexed payload fields per collection. Incident payloads hold only these
+# fields; everything else lives in the incident store
+PAYLOAD_INDEXES = {
+    "incidents": {
+        "type": PayloadSchemaType.KEYWORD,
+        "severity": PayloadSchemaType.KEYWORD,
+        "status": PayloadSchemaType.KEYWORD,
+        "currency": PayloadSchemaType.KEYWORD,
+        "customer_id": PayloadSchemaType.KEYWORD,
+        "service_id": PayloadSchemaType.KEYWORD,
+        "financial_impact": PayloadSchemaType.FLOAT,
+        "detection_date": PayloadSchemaType.FLOAT
+    },
+    "kb_fixes": {
+        "type": PayloadSchemaType.KEYWORD,
+        "customer_id": PayloadSchemaType.KEYWORD,
+        "service_id": PayloadSchemaType.KEYWORD
+    },
+    "contract_clauses": {
+        "contract_id": PayloadSchemaType.KEYWORD,
+        "clause_type": PayloadSchemaType.KEYWORD,
+        "customer_id": PayloadSchemaType.KEYWORD
+    }
+}
+
+# Related entities a stored fix must share with an incident to be matched
+KB_MATCH_ENTITIES = ("customer_id", "service_id")
+
+def collection_config(collection_name: str) -> dict:
+    """Vector configuration used when creating a collection"""
+    dense = VectorParams(size=settings.EMBEDDING_SIZE, distance=Distance.COSINE)
+    if collection_name in HYBRID_COLLECTIONS:
+        # IDF is applied by Qdrant, the client only sends BM25 term weights
+        return {
+            "vectors_config": {"dense": dense},
+            "sparse_vectors_config": {"sparse": SparseVectorParams(modifier=Modifier.IDF)}
+        }
+    return {"vectors_config": dense}
+
+def create_payload_indexes(client: QdrantClient, collection_name: str, name: Optional[str] = None):
+    """
+    Create the PAYLOAD_INDEXES of ``name`` on a collection
+    
+    ``name`` is the alias the collection is served under and defaults to
+    the collection name itself.
+    """
+    # Payload indexes have no effect in the embedded engine
+    if settings.QDRANT_MODE != "server":
+        return
+    for field_name, field_schema in PAYLOAD_INDEXES.get(name or collection_name, {}).items():
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema
+        )
+
+def resolve_collection(client: QdrantClient, name: str) -> Optional[str]:
+    """Return the collection currently served under ``name``, if any"""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    if client.collection_exists(name):
+        return name
+    return None
+
+def create_aliased_collection(client: QdrantClient, name: str) -> Optional[str]:
+    """
+    Create the first versioned collection for ``name`` behind an alias
+    
+    Collections are created as ``<name>_v1`` and served through the alias
+    ``<name>``, so a reindex can later repoint the alias without the name
+    ever being unavailable. Nothing is created if ``name`` is already served.
+    
+    Returns:
+        Name of the created collection, or None if ``name`` already existed
+    """
+    if resolve_collection(client, name) is not None:
+        return None
+    
+    collection_name = f"{name}_v1"
+    client.create_collection(
+        collection_name=collection_name,
+        **collection_config(name)
+    )
+    
+    create_payload_indexes(client, collection_name, name)
+    client.update_collection_aliases(change_aliases_operations=[
+        CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=name))
+    ])
+    return collection_name
+
+def compact_incident_payload(incident_id: str, incident_data: dict) -> dict:
+    """
+    Build the compact Qdrant payload for an incident
+    
+    Only indexed, filterable fields are kept, with the detection date as a
+    Unix timestamp. ``ref`` is the incident store key for the full record.
+    """
+    related_entities = incident_data.get("related_entities") or {}
+    detection_date = incident_data.get("detection_date")
+    if isinstance(detection_date, str):
+        detection_date = datetime.fromisoformat(detection_date)
+    
+    return {
+        "ref": incident_id,
+        "type": incident_data.get("type"),
+        "severity": incident_data.get("severity"),
+        "status": incident_data.get("status"),
+        "currency": incident_data.get("currency"),
+        "customer_id": related_entities.get("customer_id"),
+        "service_id": related_entities.get("service_id"),
+        "financial_impact": incident_data.get("financial_impact"),
+        "detection_date": detection_date.timestamp() if detection_date else None,
+        "member_count": max(len(incident_data.get("member_ids") or []), 1)
+    }
+
+def create_qdrant_client() -> QdrantClient:
+    """
+    Create a Qdrant client for the configured QDRANT_MODE
+    
+    "server" connects to a networked Qdrant instance (self-hosted or Cloud),
+    "memory" runs qdrant-client's embedded engine in-process and "local"
+    runs it persisted under QDRANT_PATH. Embedded storage can only be opened
+    once per process, so embedded clients are shared. Any other mode
+    raises ValueError.
+    """
+    mode = settings.QDRANT_MODE
+    if mode not in ("server", "memory", "local"):
+        raise ValueError(f"Unknown QDRANT_MODE {mode!r}, expected server, memory or local")
+    if mode in ("memory", "local"):
+        location = ":memory:" if mode == "memory" else settings.QDRANT_PATH
+        if location not in _embedded_clients:
+            if mode == "memory":
+                _embedded_clients[location] = QdrantClient(location=":memory:")
+            else:
+                _embedded_clients[location] = QdrantClient(path=settings.QDRANT_PATH)
+        return _embedded_clients[location]
+    
+    # Handle Qdrant Cloud configuration
+    if hasattr(settings, 'QDRANT_API_KEY') and settings.QDRANT_API_KEY:
+        return QdrantClient(
+            url=f"https://{settings.QDRANT_HOST}:{settings.QDRANT_PORT}" if getattr(settings, 'QDRANT_USE_HTTPS', False) else f"http://{settings.QDRANT_HOST}:{settings.QDRANT_PORT}",
+            api_key=settings.QDRANT_API_KEY,
+        )
+    
+    # Self-hosted Qdrant
+    return QdrantClient(
+        host=settings.QDRANT_HOST,
+        port=settings.QDRANT_PORT
+    )
+
 class QdrantService:
     def __init__(self):
         """Initialize Qdrant client"""
-        # Handle Qdrant Cloud configuration
-        if hasattr(settings, 'QDRANT_API_KEY') and settings.QDRANT_API_KEY:
-            self.client = QdrantClient(
-                url=f"https://{settings.QDRANT_HOST}:{settings.QDRANT_PORT}" if getattr(settings, 'QDRANT_USE_HTTPS', False) else f"http://{settings.QDRANT_HOST}:{settings.QDRANT_PORT}",
-                api_key=settings.QDRANT_API_KEY,
-            )
-        else:
-            # Self-hosted Qdrant
-            self.client = QdrantClient(
-                host=settings.QDRANT_HOST,
-                port=settings.QDRANT_PORT
-            )
+        self.client = create_qdrant_client()
+        
+        if settings.EMBEDDING_BACKEND not in ("placeholder", "gemini"):
+            raise ValueError(f"Unknown EMBEDDING_BACKEND {settings.EMBEDDING_BACKEND!r}, expected placeholder or gemini")
         
         # Initialize Gemini for embeddings
         if settings.GEMINI_API_KEY:
             genai.configure(api_key=settings.GEMINI_API_KEY)
             self.gemini_model = genai.GenerativeModel('gemini-pro')
+        
+        # LRU cache of embeddings keyed by text, shared across worker threads
+        self._embedding_cache = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
     
     def create_collections(self):
         """Create required collections in Qdrant"""
@@ -38,51 +199,212 @@ class QdrantService:
         
         for collection_name in collections:
             try:
-                self.client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(size=768, distance=Distance.COSINE)
-                )
-                print(f"Created collection: {collection_name}")
+                created = create_aliased_collection(self.client, collection_name)
             except Exception as e:
-                print(f"Collection {collection_name} may already exist: {e}")
+                print(f"Error creating collection {collection_name}: {e}")
+                continue
+            if created:
+                print(f"Created collection: {created} (alias {collection_name})")
+    
+    @property
+    def semantic_embeddings(self) -> bool:
+        """
+        Whether embeddings come from a real embedding model
+        
+        Placeholder vectors all point the same way, so their similarity
+        scores carry no meaning. Set EMBEDDING_BACKEND=gemini (with
+        GEMINI_API_KEY) to embed with EMBEDDING_MODEL.
+        """
+        return settings.EMBEDDING_BACKEND == "gemini" and bool(settings.GEMINI_API_KEY)
     
     def generate_embedding(self, text: str) -> list:
-        """Generate embedding for text using Gemini"""
+        """Generate embedding for text, with Gemini when EMBEDDING_BACKEND=gemini"""
+        if self.semantic_embeddings:
+            try:
+                result = genai.embed_content(model=settings.EMBEDDING_MODEL, content=text)
+                return list(result["embedding"])[:settings.EMBEDDING_SIZE]
+            except Exception as e:
+                print(f"Error generating embedding: {e}")
+                return [0.0] * settings.EMBEDDING_SIZE
+        
         if not settings.GEMINI_API_KEY:
             # Return a dummy embedding for testing
-            return [0.1] * 768
+            return [0.1] * settings.EMBEDDING_SIZE
             
         # For actual implementation, we would use Gemini's embedding API
         # This is a simplified version for demonstration
         try:
             # Generate a mock embedding based on text length
             # In real implementation, use proper embedding API
-            embedding = [len(text) / 1000.0] * 768
-            return embedding[:768]  # Ensure correct size
+            embedding = [len(text) / 1000.0] * settings.EMBEDDING_SIZE
+            return embedding[:settings.EMBEDDING_SIZE]  # Ensure correct size
         except Exception as e:
             print(f"Error generating embedding: {e}")
-            return [0.0] * 768
+            return [0.0] * settings.EMBEDDING_SIZE
     
-    def upsert_incident(self, incident_id: str, incident_data: dict):
-        """Insert or update an incident in Qdrant"""
-        # Generate embedding for incident description
-        description = incident_data.get("description", "")
-        embedding = self.generate_embedding(description)
+    def generate_embeddings(self, texts: List[str]) -> List[list]:
+        """Generate embeddings for a batch of texts, reusing cached ones"""
+        embeddings = [None] * len(texts)
+        missing = []
+        with self._embedding_cache_lock:
+            for index, text in enumerate(texts):
+                cached = self._embedding_cache.get(text)
+                if cached is None:
+                    missing.append(index)
+                else:
+                    self._embedding_cache.move_to_end(text)
+                    embeddings[index] = cached
         
-        # Create point for Qdrant
-        point = PointStruct(
-            id=incident_id,
-            vector=embedding,
-            payload=incident_data
+        for index in missing:
+            embeddings[index] = self.generate_embedding(texts[index])
+        
+        with self._embedding_cache_lock:
+            for index in missing:
+                self._embedding_cache[texts[index]] = embeddings[index]
+            while len(self._embedding_cache) > settings.EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+        
+        return embeddings
+    
+    def upsert_incidents(self, incidents: Dict[str, dict]) -> List[str]:
+        """
+        Insert or update several incidents
+        
+        The vector store gets a compact payload per incident while the full
+        record, including description and evidence, goes to the incident store.
+        """
+        incident_ids = list(incidents)
+        embeddings = self.generate_embeddings(
+            [incidents[incident_id].get("description", "") for incident_id in incident_ids]
         )
         
+        incident_store.put_many(incidents)
+        
+        # Create points for Qdrant
+        points = [
+            PointStruct(
+                id=incident_id,
+                vector=embedding,
+                payload=compact_incident_payload(incident_id, incidents[incident_id])
+            )
+            for incident_id, embedding in zip(incident_ids, embeddings)
+        ]
+        
         # Upsert to incidents collection
         self.client.upsert(
             collection_name="incidents",
-            points=[point]
+            points=points
         )
         
+        return incident_ids
+    
+    def upsert_incident(self, incident_id: str, incident_data: dict):
+        """Insert or update an incident in Qdrant"""
+        self.upsert_incidents({incident_id: incident_data})
         return incident_id
+    
+    def get_incident(self, incident_id: str) -> Optional[dict]:
+        """Fetch the full record of an incident from the incident store"""
+        return incident_store.get(incident_id)
+    
+    def record_fix(self, incident_data: dict) -> Optional[str]:
+        """
+        Store a resolved incident's root cause and resolution in kb_fixes
+        
+        Fixes are embedded by incident description so new incidents can be
+        matched against them before running root cause analysis.
+        """
+        if not incident_data.get("root_cause") or not incident_data.get("resolution"):
+            return None
+        
+        related_entities = incident_data.get("related_entities") or {}
+        point = PointStruct(
+            id=incident_data["id"],
+            vector=self.generate_embeddings([incident_data.get("description", "")])[0],
+            payload={
+                "incident_id": incident_data["id"],
+                "type": incident_data.get("type"),
+                **{entity: related_entities.get(entity) for entity in KB_MATCH_ENTITIES},
+                "description": incident_data.get("description", ""),
+                "root_cause": incident_data["root_cause"],
+                "resolution": incident_data["resolution"]
+            }
+        )
+        self.client.upsert(collection_name="kb_fixes", points=[point])
+        return incident_data["id"]
+    
+    def find_similar_fix(self, incident_data: dict, score_threshold: Optional[float] = None) -> Optional[dict]:
+        """
+        Find the closest resolved fix for an incident of the same type
+        
+        Fixes must also be for the same customer and service
+        (KB_MATCH_ENTITIES), where the incident names them.
+        
+        Returns the fix payload with its similarity ``score``, or None if no
+        fix reaches ``score_threshold`` (defaults to KB_HINT_THRESHOLD).
+        """
+        score_threshold = settings.KB_HINT_THRESHOLD if score_threshold is None else score_threshold
+        related_entities = incident_data.get("related_entities") or {}
+        conditions = [FieldCondition(key="type", match=MatchValue(value=incident_data.get("type")))]
+        conditions.extend(
+            FieldCondition(key=entity, match=MatchValue(value=related_entities[entity]))
+            for entity in KB_MATCH_ENTITIES
+            if related_entities.get(entity)
+        )
+        try:
+            response = self.client.query_points(
+                collection_name="kb_fixes",
+                query=self.generate_embeddings([incident_data.get("description", "")])[0],
+                query_filter=Filter(must=conditions),
+                score_threshold=score_threshold,
+                limit=1,
+                with_payload=True
+            )
+        except Exception as e:
+            print(f"Error searching kb_fixes: {e}")
+            return None
+        
+        if not response.points:
+            return None
+        match = response.points[0]
+        return {**match.payload, "score": match.score}
+    
+    def search_similar_incidents_batch(self, descriptions: List[str], limit: int = 5,
+                                       batch_size: Optional[int] = None) -> List[list]:
+        """
+        Search for similar incidents for many descriptions at once
+        
+        All descriptions are embedded together and the queries are sent to
+        Qdrant in chunks of ``batch_size``, one round-trip per chunk.
+        
+        Args:
+            descriptions: Incident descriptions to find neighbours for
+            limit: Number of neighbours to return per description
+            batch_size: Queries per request (defaults to QDRANT_SEARCH_BATCH_SIZE)
+            
+        Returns:
+            List of scored points per description, in input order
+        """
+        batch_size = batch_size or settings.QDRANT_SEARCH_BATCH_SIZE
+        embeddings = self.generate_embeddings(descriptions)
+        
+        results = []
+        for start in range(0, len(embeddings), batch_size):
+            requests = [
+                QueryRequest(query=embedding, limit=limit, with_payload=True)
+                for embedding in embeddings[start:start + batch_size]
+            ]
+            try:
+                responses = self.client.query_batch_points(
+                    collection_name="incidents",
+                    requests=requests
+                )
+                results.extend(response.points for response in responses)
+            except Exception as e:
+                print(f"Error searching for similar incidents: {e}")
+                results.extend([] for _ in requests)
+        
+        return results
 
 # Global instance
 qdrant_service = QdrantService()
\ No newline at end of file
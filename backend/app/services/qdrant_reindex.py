@@ -0,0 +1,191 @@
+"""
+Parallel reindexing of Qdrant collections behind aliases
+
+Collections are served through an alias of the same name ("incidents",
+"kb_fixes", ...). A reindex re-embeds every payload into a fresh versioned
+collection and then repoints the alias in a single atomic operation, so
+readers never see a partially loaded collection.
+
+Usage:
+    python -m app.services.qdrant_reindex incidents --workers 16
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from contextlib import nullcontext
+from typing import Optional
+import re
+import threading
+import typer
+from qdrant_client.models import (
+    PointStruct, CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+)
+from app.config.settings import settings
+from app.services.qdrant_client import (
+    qdrant_service, collection_config, create_payload_indexes, resolve_collection, HYBRID_COLLECTIONS
+)
+from app.services.contract_clauses import clause_vectors
+from app.services.incident_store import incident_store
+
+# Payload field holding the text that is embedded for each collection
+EMBEDDED_TEXT_FIELDS = {
+    "incidents": "description",
+    "contract_clauses": "content",
+    "usage_templates": "description",
+    "kb_fixes": "description"
+}
+
+def switch_alias(client, alias: str, collection_name: str):
+    """Point ``alias`` at ``collection_name``"""
+    operations = []
+    if resolve_collection(client, alias) not in (None, alias):
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    operations.append(CreateAliasOperation(
+        create_alias=CreateAlias(collection_name=collection_name, alias_name=alias)
+    ))
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+def next_version_name(name: str, current: str) -> str:
+    """
+    Versioned collection name following ``current`` for the alias ``name``
+
+    ``<name>_v3`` is followed by ``<name>_v4``; a collection without a
+    version suffix (a legacy one served directly under ``name``) is
+    followed by ``<name>_v1``.
+    """
+    match = re.fullmatch(rf"{re.escape(name)}_v(\d+)", current)
+    version = int(match.group(1)) + 1 if match else 1
+    return f"{name}_v{version}"
+
+def reindex_collection(name: str, page_size: Optional[int] = None, workers: Optional[int] = None,
+                       keep_old: bool = False) -> str:
+    """
+    Re-embed a collection into a new one and switch the alias over to it
+
+    Pages are scrolled from the current collection and handed to a pool of
+    workers, which re-embed the payload text in EMBEDDING_BATCH_SIZE batches
+    through the embedding cache and bulk-load the result with upload_points.
+    The new collection uses the current EMBEDDING_SIZE and gets the same
+    payload indexes as a freshly created one. It is named after the next
+    version of the collection the alias serves (``<name>_v2`` after
+    ``<name>_v1``), and the reindex fails if that collection already exists.
+
+    Collections are created behind an alias from the start (see
+    ``create_aliased_collection``). A legacy collection that is not yet
+    behind one (created before aliases were introduced) has to be dropped before its name can become an alias,
+    so that first migration has a brief window where the name is unavailable
+    and the previous collection cannot be kept.
+
+    Args:
+        name: Collection (alias) name to reindex
+        page_size: Points per scrolled page (defaults to REINDEX_PAGE_SIZE)
+        workers: Parallel re-embedding workers (defaults to REINDEX_WORKERS)
+        keep_old: Keep the previous collection instead of dropping it
+
+    Returns:
+        Name of the new collection now served under ``name``
+    """
+    page_size = page_size or settings.REINDEX_PAGE_SIZE
+    workers = workers or settings.REINDEX_WORKERS
+    client = qdrant_service.client
+    text_field = EMBEDDED_TEXT_FIELDS.get(name, "description")
+
+    source = resolve_collection(client, name)
+    if source is None:
+        raise ValueError(f"Collection {name} does not exist")
+
+    # Concurrent reindexes of the same collection pick the same target, so only one can proceed
+    target = next_version_name(name, source)
+    if client.collection_exists(target):
+        raise ValueError(f"Collection {target} already exists, is another reindex of {name} running?")
+    client.create_collection(
+        collection_name=target,
+        **collection_config(name)
+    )
+    create_payload_indexes(client, target, name)
+
+    # The embedded engine is not safe for concurrent writes, only embed in parallel there
+    upload_lock = threading.Lock() if settings.QDRANT_MODE in ("memory", "local") else nullcontext()
+
+    def reembed_and_load(records) -> int:
+        texts = [str(record.payload.get(text_field) or "") for record in records]
+        if name == "incidents":
+            # Incident text lives in the incident store, not the payload
+            details = incident_store.get_many([str(record.id) for record in records])
+            texts = [
+                str(details.get(str(record.id), {}).get(text_field) or text)
+                for record, text in zip(records, texts)
+            ]
+        vectors = []
+        for start in range(0, len(texts), settings.EMBEDDING_BATCH_SIZE):
+            vectors.extend(qdrant_service.generate_embeddings(texts[start:start + settings.EMBEDDING_BATCH_SIZE]))
+        if name in HYBRID_COLLECTIONS:
+            vectors = [clause_vectors(text, vector) for text, vector in zip(texts, vectors)]
+
+        with upload_lock:
+            client.upload_points(
+                collection_name=target,
+                points=[
+                    PointStruct(id=record.id, vector=vector, payload=record.payload)
+                    for record, vector in zip(records, vectors)
+                ],
+                batch_size=page_size,
+                wait=True
+            )
+        return len(records)
+
+    # Keep at most two pages per worker in flight so memory stays bounded
+    copied = 0
+    pending = set()
+    offset = None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    records, offset = client.scroll(
+                        collection_name=source,
+                        limit=page_size,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=False
+                    )
+                    if records:
+                        pending.add(executor.submit(reembed_and_load, records))
+
+                    if len(pending) >= workers * 2 or offset is None:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED if offset is not None else ALL_COMPLETED)
+                        copied += sum(future.result() for future in done)
+
+                    if offset is None:
+                        break
+            except Exception:
+                # Don't start queued pages; running ones finish before the pool exits
+                for future in pending:
+                    future.cancel()
+                raise
+    except Exception:
+        # Drop the half-loaded collection; the alias still serves the source
+        client.delete_collection(collection_name=target)
+        raise
+
+    if source == name:
+        client.delete_collection(collection_name=source)
+    switch_alias(client, name, target)
+    if source != name and not keep_old:
+        client.delete_collection(collection_name=source)
+
+    print(f"Reindexed {copied} points from {source} into {target}")
+    return target
+
+cli = typer.Typer(help="Qdrant collection maintenance")
+
+@cli.command()
+def reindex(
+    collection: str = typer.Argument(..., help="Collection to reindex"),
+    page_size: int = typer.Option(None, help="Points per scrolled page"),
+    workers: int = typer.Option(None, help="Parallel re-embedding workers"),
+    keep_old: bool = typer.Option(False, help="Keep the previous collection")
+):
+    """Re-embed a collection and switch its alias over atomically"""
+    reindex_collection(collection, page_size=page_size, workers=workers, keep_old=keep_old)
+
+if __name__ == "__main__":
+    cli()
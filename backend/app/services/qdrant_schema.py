@@ -1,9 +1,12 @@
 """
 Qdrant schema implementation and examples
 """
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, CollectionStatus
+from qdrant_client.models import PointStruct, CollectionStatus
 from app.config.settings import settings
+from app.services.qdrant_client import (
+    create_qdrant_client, create_aliased_collection, compact_incident_payload
+)
+from app.services.incident_store import incident_store
 from app.models.data_models import Incident
 from typing import List, Dict, Any
 import json
@@ -14,44 +17,33 @@ class QdrantSchema:
     
     def __init__(self):
         """Initialize Qdrant client"""
-        self.client = QdrantClient(
-            host=settings.QDRANT_HOST,
-            port=settings.QDRANT_PORT
-        )
+        self.client = create_qdrant_client()
     
     def create_collections(self):
-        """Create all required collections in Qdrant"""
-        collections_config = {
-            "incidents": {
-                "size": 768,
-                "distance": Distance.COSINE
-            },
-            "contract_clauses": {
-                "size": 768,
-                "distance": Distance.COSINE
-            },
-            "usage_templates": {
-                "size": 768,
-                "distance": Distance.COSINE
-            },
-            "kb_fixes": {
-                "size": 768,
-                "distance": Distance.COSINE
-            }
-        }
+        """
+        Create all required collections in Qdrant
+        
+        Collections get the same vector configuration (``collection_config``,
+        named dense and sparse vectors for contract clauses) and alias as
+        those created by ``QdrantService.create_collections``.
+        """
+        collections = [
+            "incidents",
+            "contract_clauses",
+            "usage_templates",
+            "kb_fixes"
+        ]
         
-        for collection_name, config in collections_config.items():
+        for collection_name in collections:
             try:
-                self.client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(
-                        size=config["size"],
-                        distance=config["distance"]
-                    )
-                )
-                print(f"Created collection: {collection_name}")
+                created = create_aliased_collection(self.client, collection_name)
             except Exception as e:
-                print(f"Collection {collection_name} may already exist: {e}")
+                print(f"Error creating collection {collection_name}: {e}")
+                continue
+            if created:
+                print(f"Created collection: {created} (alias {collection_name})")
+            else:
+                print(f"Collection {collection_name} already exists")
     
     def get_collection_info(self, collection_name: str):
         """Get information about a collection"""
@@ -62,11 +54,12 @@ class QdrantSchema:
             print(f"Error getting collection info for {collection_name}: {e}")
             return None
 
-def generate_mock_embedding(text: str, size: int = 768) -> List[float]:
+def generate_mock_embedding(text: str, size: int = None) -> List[float]:
     """
     Generate a mock embedding based on text for demonstration purposes.
     In a real implementation, this would use Gemini's embedding API.
     """
+    size = size or settings.EMBEDDING_SIZE
     # Simple hash-based approach for deterministic mock embeddings
     hash_value = hash(text) % 1000000
     # Normalize to [0, 1] range
@@ -79,10 +72,7 @@ def upsert_incident_example():
     Example of how to upsert an incident into Qdrant
     """
     # Initialize Qdrant client
-    client = QdrantClient(
-        host=settings.QDRANT_HOST,
-        port=settings.QDRANT_PORT
-    )
+    client = create_qdrant_client()
     
     # Create a sample incident
     sample_incident = Incident(
@@ -107,11 +97,15 @@ def upsert_incident_example():
     # Generate embedding for the incident description
     embedding = generate_mock_embedding(sample_incident.description)
     
+    # Full record goes to the incident store, Qdrant only gets the compact payload
+    incident_data = sample_incident.dict()
+    incident_store.put(sample_incident.id, incident_data)
+    
     # Create point for Qdrant
     point = PointStruct(
         id=sample_incident.id,
         vector=embedding,
-        payload=sample_incident.dict()  # Convert Pydantic model to dict
+        payload=compact_incident_payload(sample_incident.id, incident_data)
     )
     
     # Upsert to incidents collection
@@ -130,10 +124,7 @@ def search_similar_incidents(incident_description: str, limit: int = 5):
     """
     Search for similar incidents using semantic similarity
     """
-    client = QdrantClient(
-        host=settings.QDRANT_HOST,
-        port=settings.QDRANT_PORT
-    )
+    client = create_qdrant_client()
     
     # Generate embedding for the query
     query_vector = generate_mock_embedding(incident_description)
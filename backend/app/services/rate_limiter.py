@@ -0,0 +1,44 @@
+"""
+Token bucket rate limiter for LLM API quotas
+"""
+from typing import Optional
+import asyncio
+import threading
+import time
+
+class TokenBucket:
+    """
+    Token bucket refilled at a fixed rate
+
+    Callers reserve tokens up front and then wait out any deficit, so the
+    bucket can be shared between threads and event loops.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: Optional[float] = None):
+        """Create a full bucket"""
+        self.rate = rate_per_second
+        self.capacity = capacity or max(rate_per_second, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` from the bucket and return how long to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def wait(self, tokens: float = 1.0):
+        """Block until ``tokens`` are available"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait asynchronously until ``tokens`` are available"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
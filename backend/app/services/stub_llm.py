@@ -0,0 +1,172 @@
+"""
+Offline stub LLM returning templated responses for benchmarks and tests
+"""
+from types import SimpleNamespace
+from typing import Any, Optional
+import asyncio
+import json
+import re
+import time
+from app.config.settings import settings
+from app.models.triage_rules import IMPACT_SEVERITY_BANDS, SEVERITY_PRIORITY, TYPE_BASE_SEVERITY
+from app.agents.prompt_builder import estimate_tokens
+
+# Distinctive phrases of each task's instructions, checked in order
+PROMPT_KINDS = [
+    ("batch_triage", "You are triaging revenue leakage incidents"),
+    ("rca", "Perform root cause analysis"),
+    ("ticket", "Create an investigation ticket"),
+    ("evidence", "Collect evidence for the revenue leakage incident"),
+    ("triage", "Analyze the revenue leakage incident")
+]
+
+INCIDENT_LINE = re.compile(r"^incident: (\{.*\})$", re.MULTILINE)
+
+# Team a ticket is routed to per incident type
+TICKET_TEAMS = {
+    "missing_charge": "Billing Operations",
+    "incorrect_rate": "Pricing and Contracts",
+    "usage_mismatch": "Usage Metering",
+    "duplicate_entry": "Billing Operations"
+}
+
+def impact_severity(impact: Optional[float], incident_type: Optional[str] = None) -> str:
+    """Severity band of a financial impact, as used by the rule-based triage"""
+    if impact is None:
+        return TYPE_BASE_SEVERITY.get(incident_type, "medium")
+    for upper, severity in IMPACT_SEVERITY_BANDS:
+        if impact < upper:
+            return severity
+    return "critical"
+
+def prompt_kind(prompt: str) -> str:
+    """Task a prompt belongs to, or ``generic``"""
+    for kind, phrase in PROMPT_KINDS:
+        if phrase in prompt:
+            return kind
+    return "generic"
+
+def prompt_incident(prompt: str) -> dict:
+    """Compact incident rendered on the ``incident:`` line of a task prompt"""
+    match = INCIDENT_LINE.search(prompt)
+    if not match:
+        return {}
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return {}
+
+def render_response(prompt: str) -> str:
+    """
+    Deterministic, schema-valid response for a prompt
+
+    Batch triage prompts get a JSON array with one result per incident line,
+    RCA prompts a JSON analysis and the other agent tasks structured text
+    built from the incident in the prompt.
+    """
+    kind = prompt_kind(prompt)
+
+    if kind == "batch_triage":
+        results = []
+        for line in prompt.split("Incidents:\n", 1)[-1].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            severity = impact_severity(record.get("impact"), record.get("type"))
+            results.append({
+                "id": record.get("id"),
+                "severity": severity,
+                "priority": SEVERITY_PRIORITY[severity],
+                "classification_confirmed": True,
+                "evidence_sources": ["billing records"],
+                "notes": f"Stub triage of {record.get('type')} incident"
+            })
+        return json.dumps(results)
+
+    incident = prompt_incident(prompt)
+    incident_id = incident.get("id", "unknown")
+    incident_type = incident.get("type", "unknown")
+    severity = incident.get("severity") or impact_severity(incident.get("financial_impact"), incident_type)
+
+    if kind == "rca":
+        return json.dumps({
+            "incident_id": incident_id,
+            "root_cause": f"Stub root cause for {incident_type}",
+            "hypotheses": [
+                {"hypothesis": "Configuration drift between provisioning and billing",
+                 "supporting_evidence": ["Stub evidence"]},
+                {"hypothesis": "Manual override during invoicing", "supporting_evidence": []}
+            ],
+            "systemic_issues": ["No reconciliation between source systems"],
+            "preventive_measures": ["Add an automated reconciliation check"]
+        })
+    if kind == "ticket":
+        return (
+            f"Ticket for incident {incident_id}\n"
+            f"Assigned team: {TICKET_TEAMS.get(incident_type, 'Revenue Assurance')}\n"
+            f"Priority: {SEVERITY_PRIORITY.get(severity, 'P3')}\n"
+            "Next steps: verify the root cause and correct the affected records"
+        )
+    if kind == "evidence":
+        return (
+            f"Evidence for incident {incident_id}\n"
+            "Records: billing, provisioning and contract records listed in the input\n"
+            "Anomalies: none beyond the detected incident"
+        )
+    if kind == "triage":
+        return (
+            f"Classification: {incident_type} (confirmed)\n"
+            f"Severity: {severity}\n"
+            f"Priority: {SEVERITY_PRIORITY.get(severity, 'P3')}\n"
+            "Evidence sources: billing records, contracts"
+        )
+    return "Stub response"
+
+class StubResponse:
+    """Response with the ``text`` and ``usage_metadata`` of a Gemini response"""
+
+    def __init__(self, text: str, prompt_tokens: int, output_tokens: int):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens
+        )
+
+class StubGenerativeModel:
+    """
+    Offline stand-in for ``genai.GenerativeModel``
+
+    Responses come from ``render_response`` after a simulated latency.
+    Output token counts are estimated from the response text unless a
+    fixed count is configured.
+    """
+
+    def __init__(self, latency_ms: Optional[float] = None, output_tokens: Optional[int] = None):
+        """
+        Args:
+            latency_ms: Simulated latency per call (defaults to STUB_LLM_LATENCY_MS)
+            output_tokens: Reported output tokens per call (defaults to
+                STUB_LLM_OUTPUT_TOKENS; 0 estimates them from the text)
+        """
+        self.latency = (settings.STUB_LLM_LATENCY_MS if latency_ms is None else latency_ms) / 1000.0
+        self.output_tokens = settings.STUB_LLM_OUTPUT_TOKENS if output_tokens is None else output_tokens
+
+    def _response(self, prompt: Any) -> StubResponse:
+        """Templated response with token usage"""
+        prompt = str(prompt)
+        text = render_response(prompt)
+        return StubResponse(text, estimate_tokens(prompt), self.output_tokens or estimate_tokens(text))
+
+    def generate_content(self, prompt: Any, generation_config: Optional[dict] = None) -> StubResponse:
+        """Blocking generation"""
+        if self.latency:
+            time.sleep(self.latency)
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt: Any, generation_config: Optional[dict] = None) -> StubResponse:
+        """Non-blocking generation"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._response(prompt)
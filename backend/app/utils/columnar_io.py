@@ -0,0 +1,149 @@
+"""
+Columnar Parquet and Arrow IPC input and output for record datasets
+"""
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Type, Union, get_args
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+from app.config.settings import settings
+from app.models.data_models import BillingRecord, ProvisioningRecord, UsageRecord
+from app.utils.record_loaders import validate_batch
+
+# Flat record datasets stored in columnar files
+DATASET_MODELS = {
+    "billing": BillingRecord,
+    "provisioning": ProvisioningRecord,
+    "usage": UsageRecord
+}
+
+COLUMNAR_FORMATS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow"
+}
+
+def columnar_format(path: str, file_format: Optional[str] = None) -> str:
+    """``parquet`` or ``arrow`` for a path, from its extension unless given"""
+    file_format = file_format or COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in ("parquet", "arrow"):
+        raise ValueError(f"Unsupported columnar file format: {file_format or path}")
+    return file_format
+
+def arrow_schema(model: Type[BaseModel]) -> pa.Schema:
+    """Arrow schema for the fields of a flat record model"""
+    fields = []
+    for name, field in model.model_fields.items():
+        types = get_args(field.annotation) or (field.annotation,)
+        if datetime in types:
+            arrow_type = pa.timestamp("us")
+        elif float in types:
+            arrow_type = pa.float64()
+        elif int in types:
+            arrow_type = pa.int64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type, nullable=type(None) in types))
+    return pa.schema(fields)
+
+def to_table(records: Union[pd.DataFrame, Sequence[Union[dict, BaseModel]]], model: Type[BaseModel]) -> pa.Table:
+    """
+    Arrow table of records in the model's schema
+
+    Records can be a DataFrame, dictionaries or models; ISO date strings
+    are cast to timestamps.
+    """
+    schema = arrow_schema(model)
+    if isinstance(records, pd.DataFrame):
+        table = pa.Table.from_pandas(records[schema.names], preserve_index=False)
+    else:
+        rows = [record.dict() if isinstance(record, BaseModel) else record for record in records]
+        table = pa.table({name: [row.get(name) for row in rows] for name in schema.names})
+    return table.cast(schema)
+
+def write_table(table: pa.Table, path: str, file_format: Optional[str] = None):
+    """Write a table as Parquet or as an Arrow IPC file"""
+    if columnar_format(path, file_format) == "parquet":
+        pq.write_table(table, path)
+    else:
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+class ColumnarWriter:
+    """Append tables with one schema to a Parquet or Arrow IPC file"""
+
+    def __init__(self, path: str, schema: pa.Schema, file_format: Optional[str] = None):
+        self.file_format = columnar_format(path, file_format)
+        self.schema = schema
+        if self.file_format == "parquet":
+            self._writer = pq.ParquetWriter(path, schema)
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, table: pa.Table):
+        """Append a table, cast to the writer's schema"""
+        self._writer.write_table(table.select(self.schema.names).cast(self.schema))
+
+    def close(self):
+        self._writer.close()
+        if self.file_format == "arrow":
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_table(source: Union[str, bytes], columns: Optional[List[str]] = None,
+               file_format: Optional[str] = None) -> pa.Table:
+    """
+    Read a Parquet or Arrow IPC file, memory-mapped when it is a path
+
+    Args:
+        source: File path, or the file contents (then ``file_format`` is required)
+        columns: Columns to read; others are never loaded (Parquet) or copied (Arrow)
+        file_format: ``parquet`` or ``arrow`` (defaults to the file extension)
+    """
+    if isinstance(source, bytes):
+        file_format = columnar_format("", file_format)
+        source = pa.BufferReader(source)
+    else:
+        file_format = columnar_format(source, file_format)
+
+    if file_format == "parquet":
+        return pq.read_table(source, columns=columns, memory_map=True)
+
+    if isinstance(source, str):
+        source = pa.memory_map(source, "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+def iter_columnar_batches(source: Union[str, bytes], model: Type[BaseModel], batch_size: int,
+                          skip_invalid: bool = False,
+                          file_format: Optional[str] = None) -> Iterator[List[BaseModel]]:
+    """Validated batches of the model's columns from a Parquet or Arrow IPC file"""
+    if isinstance(source, str) and columnar_format(source, file_format) == "parquet":
+        parquet_file = pq.ParquetFile(source, memory_map=True)
+        columns = [name for name in model.model_fields if name in parquet_file.schema_arrow.names]
+        batches = parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+    else:
+        table = read_table(source, file_format=file_format)
+        table = table.select([name for name in model.model_fields if name in table.column_names])
+        batches = table.to_batches(max_chunksize=batch_size)
+
+    for batch in batches:
+        yield validate_batch(model, batch.to_pylist(), skip_invalid)
+
+def read_records(source: Union[str, bytes], model: Type[BaseModel], skip_invalid: bool = False,
+                 file_format: Optional[str] = None) -> List[BaseModel]:
+    """All records of a columnar file as validated models"""
+    return [
+        record
+        for batch in iter_columnar_batches(source, model, settings.LOADER_BATCH_SIZE, skip_invalid, file_format)
+        for record in batch
+    ]
@@ -1,6 +1,6 @@
 """
 Data Generator for Revenue Leakage Detection System
-Generates sample PDF, CSV, and JSON files with realistic billing, provisioning, and contract data
+Generates sample PDF, CSV, JSON, Parquet and Arrow files with realistic billing, provisioning, usage and contract data
 """
 import os
 import json
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from fpdf import FPDF
 import fitz  # PyMuPDF
 import pandas as pd
+from app.utils.columnar_io import DATASET_MODELS, read_table, to_table, write_table
 
 class DataGenerator:
     """Generate sample data files for testing the Revenue Leakage Detection System"""
@@ -145,7 +146,7 @@ class DataGenerator:
         for record in billing_data:
             pdf.cell(30, 10, record["invoice_id"][:10], 1)
             pdf.cell(30, 10, record["customer_id"][:10], 1)
-            pdf.cell(30, 10, record["service_id"][:10], 1)
+            pdf.cell(30, 10, record["service_id"], 1)
             pdf.cell(30, 10, f"${record['amount']:.2f}", 1)
             pdf.cell(30, 10, record["billing_date"], 1)
             pdf.cell(30, 10, record["status"][:10], 1)
@@ -181,6 +182,24 @@ class DataGenerator:
         
         return filepath, contract_data
     
+    def generate_columnar_files(self, num_records=100, file_format="parquet"):
+        """Generate sample billing, provisioning and usage files as Parquet or Arrow IPC"""
+        extension = "parquet" if file_format == "parquet" else "arrow"
+        generators = {
+            "billing": self.generate_sample_billing_data,
+            "provisioning": self.generate_sample_provisioning_data,
+            "usage": self.generate_sample_usage_data
+        }
+        
+        files = {}
+        for dataset, generate in generators.items():
+            data = generate(num_records)
+            filepath = os.path.join(self.output_dir, f"sample_{dataset}.{extension}")
+            write_table(to_table(data, DATASET_MODELS[dataset]), filepath, file_format)
+            files[dataset] = (filepath, data)
+        
+        return files
+    
     def read_pdf_with_ocr(self, pdf_path):
         """Read PDF file content using OCR (placeholder implementation)"""
         try:
@@ -217,6 +236,14 @@ class DataGenerator:
         except Exception as e:
             print(f"Error reading JSON: {e}")
             return None
+    
+    def read_columnar_file(self, path, columns=None):
+        """Read Parquet or Arrow IPC file content, optionally only some columns"""
+        try:
+            return read_table(path, columns=columns).to_pylist()
+        except Exception as e:
+            print(f"Error reading columnar file: {e}")
+            return None
 
 # Example usage
 if __name__ == "__main__":
@@ -240,4 +267,9 @@ if __name__ == "__main__":
     print(f"CSV records: {len(csv_content) if csv_content else 0}")
     
     json_content = generator.read_json_file(json_path)
-    print(f"JSON records: {len(json_content) if json_content else 0}")
\ No newline at end of file
+    print(f"JSON records: {len(json_content) if json_content else 0}")
+    
+    columnar_files = generator.generate_columnar_files()
+    for dataset, (path, _) in columnar_files.items():
+        columnar_content = generator.read_columnar_file(path)
+        print(f"{dataset.capitalize()} Parquet records: {len(columnar_content) if columnar_content else 0}")
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Layout-aware extraction of billing tables from invoice PDFs
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import re
+import fitz  # PyMuPDF
+from pydantic import ValidationError
+from app.config.settings import settings
+from app.models.data_models import BillingRecord
+from app.utils.ocr_reader import ocr_page_data, usable_text_layer
+
+# Header label of each billing table column, as lowercase words
+COLUMN_LABELS = {
+    "invoice_id": ["invoice", "id"],
+    "customer_id": ["customer", "id"],
+    "service_id": ["service", "id"],
+    "amount": ["amount"],
+    "billing_date": ["billing", "date"],
+    "status": ["status"]
+}
+
+CURRENCY_PATTERN = re.compile(r"\(([A-Z]{3})\)")
+AMOUNT_PATTERN = re.compile(r"-?[\d,]+(?:\.\d+)?")
+
+# Defaults for BillingRecord fields the invoice table does not show
+DEFAULT_CURRENCY = "USD"
+DEFAULT_DUE_DAYS = 30
+DEFAULT_PERIOD_DAYS = 30
+
+def group_rows(words: List[tuple]) -> List[List[tuple]]:
+    """
+    Group words into table rows by vertical position
+
+    Words are ``(x0, y0, x1, y1, text)`` tuples. A word starts a new row
+    when its vertical center is more than half a typical word height below
+    the current row's first word. Rows are returned top to bottom with their
+    words left to right.
+    """
+    if not words:
+        return []
+    heights = sorted(word[3] - word[1] for word in words)
+    tolerance = heights[len(heights) // 2] / 2
+
+    rows = []
+    row_center = None
+    for word in sorted(words, key=lambda word: ((word[1] + word[3]) / 2, word[0])):
+        center = (word[1] + word[3]) / 2
+        if row_center is None or center - row_center > tolerance:
+            rows.append([])
+            row_center = center
+        rows[-1].append(word)
+    return [sorted(row, key=lambda word: word[0]) for row in rows]
+
+def find_header(row: List[tuple]) -> Optional[Dict[str, float]]:
+    """Left edge of each column if ``row`` is the billing table header"""
+    texts = [word[4].lower().strip(":") for word in row]
+    columns = {}
+    for column, label in COLUMN_LABELS.items():
+        for i in range(len(texts) - len(label) + 1):
+            if texts[i:i + len(label)] == label:
+                columns[column] = row[i][0]
+                break
+    return columns if len(columns) == len(COLUMN_LABELS) else None
+
+def parse_amount(text: str) -> Optional[float]:
+    """Numeric value of an amount cell such as ``$1,201.41``"""
+    match = AMOUNT_PATTERN.search(text)
+    return float(match.group(0).replace(",", "")) if match else None
+
+class InvoiceExtractor:
+    """
+    Rebuild billing tables such as those of ``DataGenerator.generate_pdf_billing_file``
+
+    Column positions come from the header row, and every word below it goes
+    to the column whose left edge is the closest one at or before the word.
+    Pages with a usable text layer use PyMuPDF word positions; scanned pages
+    use OCR word boxes. Tables continuing on a page without a header reuse
+    the previous page's columns.
+
+    The table has no record ID, due date or billing period, so records use
+    the invoice ID as ``id``, a due date DEFAULT_DUE_DAYS after the billing
+    date and a billing period of the DEFAULT_PERIOD_DAYS up to the billing
+    date. The currency comes from the amount header, e.g. ``Amount (USD)``,
+    falling back to DEFAULT_CURRENCY.
+    """
+
+    def page_words(self, page) -> List[tuple]:
+        """Words of a page as ``(x0, y0, x1, y1, text)``, from OCR if it has no usable text layer"""
+        if usable_text_layer(page.get_text()):
+            return [tuple(word[:5]) for word in page.get_text("words")]
+        return [
+            (word["left"], word["top"], word["left"] + word["width"], word["top"] + word["height"], word["text"])
+            for word in ocr_page_data(page, settings.OCR_ZOOM)["words"]
+        ]
+
+    def extract_rows(self, words: List[tuple], columns: Optional[Dict[str, float]] = None,
+                     currency: Optional[str] = None) -> Tuple[List[dict], Optional[Dict[str, float]], Optional[str]]:
+        """
+        Table rows of one page as raw field dictionaries
+
+        Args:
+            words: Page words as ``(x0, y0, x1, y1, text)``
+            columns: Column left edges carried over from a previous page
+            currency: Currency carried over from a previous page
+
+        Returns:
+            The rows, and the columns and currency in effect at the end of the page
+        """
+        rows = []
+        for row in group_rows(words):
+            header = find_header(row)
+            if header:
+                columns = header
+                match = CURRENCY_PATTERN.search(" ".join(word[4] for word in row))
+                currency = match.group(1) if match else currency
+                continue
+            if columns is None:
+                continue
+
+            # Closest column edge at or before each word, with a little slack for OCR jitter
+            edges = sorted(columns.items(), key=lambda item: item[1])
+            slack = (row[0][3] - row[0][1]) / 2
+            cells = {}
+            for x0, _, _, _, text in row:
+                column = next((name for name, edge in reversed(edges) if x0 >= edge - slack), None)
+                if column:
+                    cells.setdefault(column, []).append(text)
+            if {"invoice_id", "amount", "billing_date"} <= cells.keys():
+                rows.append({column: " ".join(texts) for column, texts in cells.items()})
+        return rows, columns, currency
+
+    def to_record_data(self, row: dict, currency: Optional[str] = None) -> dict:
+        """BillingRecord fields for a raw table row, with defaults for missing fields"""
+        billing_date = datetime.strptime(row["billing_date"].strip(), "%Y-%m-%d")
+        return {
+            "id": row["invoice_id"],
+            "customer_id": row.get("customer_id", ""),
+            "invoice_id": row["invoice_id"],
+            "service_id": row.get("service_id", ""),
+            "amount": parse_amount(row["amount"]),
+            "currency": currency or DEFAULT_CURRENCY,
+            "billing_date": billing_date,
+            "due_date": billing_date + timedelta(days=DEFAULT_DUE_DAYS),
+            "status": row.get("status", "").lower(),
+            "billing_period_start": billing_date - timedelta(days=DEFAULT_PERIOD_DAYS),
+            "billing_period_end": billing_date
+        }
+
+    def extract_pdf(self, pdf_path: str) -> Tuple[List[BillingRecord], List[str]]:
+        """
+        Extract billing records from an invoice PDF
+
+        Returns:
+            Validated records in table order, and one message per row that
+            could not be turned into a record
+        """
+        records = []
+        errors = []
+        columns = None
+        currency = None
+        doc = fitz.open(pdf_path)
+        try:
+            for page in doc:
+                rows, columns, currency = self.extract_rows(self.page_words(page), columns, currency)
+                for row in rows:
+                    try:
+                        records.append(BillingRecord(**self.to_record_data(row, currency)))
+                    except (ValueError, ValidationError) as e:
+                        errors.append(f"Page {page.number + 1}, invoice {row.get('invoice_id')}: {e}")
+        finally:
+            doc.close()
+        return records, errors
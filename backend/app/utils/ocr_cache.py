@@ -0,0 +1,46 @@
+"""
+Content-addressed disk cache of per-page OCR results
+"""
+from typing import Optional
+import hashlib
+import json
+from app.config.settings import settings
+from app.utils.sqlite_cache import SQLiteLRUCache
+
+class OCRPageCache(SQLiteLRUCache):
+    """
+    SQLite cache of OCR text and word boxes keyed by rendered page content
+
+    Keys hash the page's rendered pixels together with the OCR settings, so
+    an unchanged page in a re-uploaded document is a hit whatever file it
+    came from. Connections are opened per process, so the cache can be
+    shared by OCR worker processes.
+    """
+
+    table = "pages"
+    value_column = "result"
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        """Set up the cache; the database is opened on first use"""
+        super().__init__(
+            path or settings.OCR_CACHE_PATH,
+            max_bytes=settings.OCR_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        )
+
+    @staticmethod
+    def make_key(pixels, width: int, height: int, params: Optional[dict] = None) -> str:
+        """Cache key for rendered page pixels and the OCR settings applied to them"""
+        digest = hashlib.sha256(pixels).hexdigest()
+        return SQLiteLRUCache.hash_key(pixels=digest, size=[width, height], params=params or {})
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached OCR result for ``key``, or None"""
+        payload = self.get_text(key)
+        return None if payload is None else json.loads(payload)
+
+    def set(self, key: str, result: dict):
+        """Store an OCR result, evicting least recently used entries if over size"""
+        self.set_text(key, json.dumps(result, separators=(",", ":")))
+
+# Global instance
+ocr_cache = OCRPageCache()
@@ -1,12 +1,145 @@
 """
 OCR Utility for reading PDF files
 """
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, Optional
+import time
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
-import io
 import cv2
 import numpy as np
+from app.config.settings import settings
+from app.utils.ocr_cache import ocr_cache, OCRPageCache
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Apply Otsu's threshold to a grayscale array, in place when it is writable"""
+    if not gray.flags.writeable:
+        gray = gray.copy()
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=gray)
+    return gray
+
+def preprocess_image(image):
+    """Binarize an image with Otsu's threshold for better OCR results"""
+    gray = np.asarray(image.convert("L")) if isinstance(image, Image.Image) else image
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+    return binarize(gray)
+
+def render_page_gray(page, zoom: float = 2.0):
+    """
+    Render a PDF page to a grayscale pixmap and a NumPy view of its samples
+    
+    The array shares the pixmap's buffer, so the pixmap must be kept alive
+    while the array is in use.
+    """
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    gray = np.ndarray((pix.height, pix.width), dtype=np.uint8, buffer=pix.samples_mv, strides=(pix.stride, 1))
+    return pix, gray
+
+def ocr_words(image) -> dict:
+    """
+    OCR an image into text and word boxes
+    
+    Returns:
+        Dictionary with the ``text`` (one line per Tesseract line) and
+        ``words``, each with its text, box in pixels and confidence
+    """
+    data = pytesseract.image_to_data(image, config=settings.OCR_TESSERACT_CONFIG,
+                                     output_type=pytesseract.Output.DICT)
+    words = []
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        words.append({
+            "text": word,
+            "left": data["left"][i],
+            "top": data["top"][i],
+            "width": data["width"][i],
+            "height": data["height"][i],
+            "conf": float(data["conf"][i])
+        })
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+    return {"text": "\n".join(" ".join(line) for line in lines.values()), "words": words}
+
+def ocr_page_data(page, zoom: float = 2.0) -> dict:
+    """
+    Render a PDF page and OCR it into text and word boxes
+    
+    Results are cached by the rendered pixels and OCR settings when
+    OCR_CACHE_ENABLED is set, so unchanged pages are never OCR'd twice.
+    """
+    pix, gray = render_page_gray(page, zoom)
+    cache = ocr_cache if settings.OCR_CACHE_ENABLED else None
+    key = None
+    if cache:
+        # Hash before thresholding, which overwrites the pixels
+        key = OCRPageCache.make_key(pix.samples_mv, pix.width, pix.height, {
+            "zoom": zoom, "threshold": "otsu", "config": settings.OCR_TESSERACT_CONFIG
+        })
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    
+    result = ocr_words(binarize(gray))
+    if cache:
+        cache.set(key, result)
+    return result
+
+def ocr_page(page, zoom: float = 2.0) -> str:
+    """Render a PDF page and OCR it"""
+    return ocr_page_data(page, zoom)["text"]
+
+def text_layer_quality(text: str) -> float:
+    """
+    Share of non-whitespace characters that look like real text
+    
+    Letters, digits and common punctuation count as good; replacement
+    characters, control characters and other symbols from broken font
+    encodings do not.
+    """
+    chars = [char for char in text if not char.isspace()]
+    if not chars:
+        return 0.0
+    good = sum(1 for char in chars if char.isalnum() or char in ".,:;-/$%()#&'\"@+*_")
+    return good / len(chars)
+
+def usable_text_layer(text: str) -> bool:
+    """Whether a page's embedded text is dense and clean enough to skip OCR"""
+    visible = sum(1 for char in text if not char.isspace())
+    return visible >= settings.OCR_MIN_TEXT_CHARS and text_layer_quality(text) >= settings.OCR_MIN_TEXT_QUALITY
+
+# Document opened once by each OCR worker process
+_worker_doc = None
+
+def _open_worker_document(pdf_path: str):
+    """Process pool initializer: open the document in this worker"""
+    global _worker_doc
+    _worker_doc = fitz.open(pdf_path)
+
+def ocr_page_result(page, zoom: float = 2.0) -> dict:
+    """
+    OCR a PDF page into a page result
+    
+    Confidence is the mean Tesseract word confidence scaled to 0-1.
+    """
+    start = time.perf_counter()
+    data = ocr_page_data(page, zoom)
+    confidences = [word["conf"] for word in data["words"] if word["conf"] >= 0]
+    return {
+        "page_number": page.number + 1,
+        "text": data["text"],
+        "source": "ocr",
+        "confidence": sum(confidences) / len(confidences) / 100.0 if confidences else 0.0,
+        "elapsed_seconds": time.perf_counter() - start,
+        "words": data["words"]
+    }
+
+def _ocr_worker_page(page_num: int, zoom: float) -> dict:
+    """OCR one page of the worker's document"""
+    return ocr_page_result(_worker_doc.load_page(page_num), zoom)
 
 class OCRReader:
     """Read text from PDF files using OCR"""
@@ -19,46 +152,88 @@ class OCRReader:
     
     def preprocess_image(self, image):
         """Preprocess image for better OCR results"""
-        # Convert PIL image to OpenCV format
-        img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+        return preprocess_image(image)
+    
+    def iter_pdf_pages(self, pdf_path, workers=None, use_text_layer=True,
+                       window: Optional[int] = None) -> Iterator[dict]:
+        """
+        Extract PDF pages one at a time, in page order
         
-        # Apply threshold to get image with only black and white
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        Each page's embedded text is used when it passes the density and
+        quality checks of ``usable_text_layer``; only image-only pages and
+        pages with garbled text are rasterized and OCR'd. With more than one
+        worker, those pages are spread across a process pool whose workers
+        open the document themselves. At most ``window`` pages are in
+        flight, so memory stays flat however long the document is.
         
-        # Convert back to PIL Image
-        return Image.fromarray(thresh)
-    
-    def read_pdf_with_ocr(self, pdf_path):
-        """Extract text from PDF using OCR"""
-        try:
-            # Open the PDF
-            doc = fitz.open(pdf_path)
-            full_text = ""
+        Args:
+            pdf_path: Path to the PDF file
+            workers: OCR processes (defaults to OCR_WORKERS; 1 runs in this process)
+            use_text_layer: Set to False to OCR every page
+            window: Pages extracted ahead of the consumer (defaults to twice the workers)
             
-            # Process each page
+        Yields:
+            Page results with ``page_number`` (from 1), ``text``, ``source``
+            (``text_layer`` or ``ocr``), ``confidence`` (0-1; text quality
+            for the text layer), ``elapsed_seconds`` and OCR ``words``
+        """
+        workers = workers or settings.OCR_WORKERS
+        window = window or workers * 2
+        doc = fitz.open(pdf_path)
+        executor = None
+        pending = deque()
+        try:
             for page_num in range(len(doc)):
                 page = doc.load_page(page_num)
+                start = time.perf_counter()
+                text = page.get_text() if use_text_layer else ""
+                if use_text_layer and usable_text_layer(text):
+                    pending.append({
+                        "page_number": page_num + 1,
+                        "text": text,
+                        "source": "text_layer",
+                        "confidence": text_layer_quality(text),
+                        "elapsed_seconds": time.perf_counter() - start,
+                        "words": []
+                    })
+                elif workers > 1:
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_document,
+                                                       initargs=(pdf_path,))
+                    pending.append(executor.submit(_ocr_worker_page, page_num, settings.OCR_ZOOM))
+                else:
+                    pending.append(ocr_page_result(page, settings.OCR_ZOOM))
                 
-                # Get page as image
-                mat = fitz.Matrix(2.0, 2.0)  # Zoom factor
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to PIL Image
-                img_data = pix.tobytes("ppm")
-                image = Image.open(io.BytesIO(img_data))
-                
-                # Preprocess image
-                processed_image = self.preprocess_image(image)
-                
-                # Perform OCR
-                text = pytesseract.image_to_string(processed_image)
-                full_text += f"--- Page {page_num + 1} ---\n{text}\n\n"
+                # Hand over finished pages at the head, blocking only when the window is full
+                while pending and (len(pending) >= window or not isinstance(pending[0], Future) or pending[0].done()):
+                    head = pending.popleft()
+                    yield head.result() if isinstance(head, Future) else head
             
+            while pending:
+                head = pending.popleft()
+                yield head.result() if isinstance(head, Future) else head
+        finally:
             doc.close()
-            return full_text
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+    
+    def read_pdf_with_ocr(self, pdf_path, workers=None, use_text_layer=True):
+        """
+        Extract text from PDF, using OCR for pages without a usable text layer
+        
+        Joins the pages from ``iter_pdf_pages``; use that directly to process
+        pages as they finish.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            workers: OCR processes (defaults to OCR_WORKERS; 1 runs in this process)
+            use_text_layer: Set to False to OCR every page
+        """
+        try:
+            return "".join(
+                f"--- Page {page['page_number']} ---\n{page['text']}\n\n"
+                for page in self.iter_pdf_pages(pdf_path, workers, use_text_layer)
+            )
         except Exception as e:
             print(f"Error reading PDF with OCR: {e}")
             return None
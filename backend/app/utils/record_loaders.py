@@ -0,0 +1,187 @@
+"""
+Streaming, typed loaders for record files (CSV, JSON arrays, NDJSON, Parquet and Arrow IPC)
+"""
+from datetime import datetime
+from typing import Iterator, List, Optional, Type, get_args
+import json
+import os
+import pandas as pd
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from app.config.settings import settings
+from app.models.data_models import BillingRecord, ProvisioningRecord, UsageRecord, Contract
+
+RECORD_MODELS = {
+    "billing": BillingRecord,
+    "provisioning": ProvisioningRecord,
+    "usage": UsageRecord,
+    "contract": Contract
+}
+
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow"
+}
+
+# Bytes read at a time when streaming JSON arrays
+JSON_READ_SIZE = 1024 * 1024
+
+_adapters = {}
+
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Cached ``TypeAdapter`` validating a list of ``model`` in one call"""
+    if model not in _adapters:
+        _adapters[model] = TypeAdapter(List[model])
+    return _adapters[model]
+
+def csv_dtypes(model: Type[BaseModel]) -> dict:
+    """
+    pandas dtypes for the flat fields of a model
+
+    Numbers are parsed by pandas' C parser; strings and dates are kept as
+    text and dates are parsed during model validation.
+    """
+    dtypes = {}
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        types = get_args(annotation) or (annotation,)
+        if float in types or int in types:
+            dtypes[name] = "float64"
+        elif str in types or datetime in types:
+            dtypes[name] = "str"
+    return dtypes
+
+def validate_batch(model: Type[BaseModel], rows: list, skip_invalid: bool = False) -> List[BaseModel]:
+    """
+    Validate rows into models in one call
+
+    With ``skip_invalid``, rows failing validation are dropped and the rest
+    are kept; otherwise the ValidationError is raised.
+    """
+    adapter = list_adapter(model)
+    try:
+        return adapter.validate_python(rows)
+    except ValidationError as e:
+        if not skip_invalid:
+            raise
+        invalid = {error["loc"][0] for error in e.errors() if error["loc"]}
+        return adapter.validate_python([row for index, row in enumerate(rows) if index not in invalid])
+
+def iter_csv_batches(path: str, model: Type[BaseModel], batch_size: int,
+                     skip_invalid: bool = False) -> Iterator[List[BaseModel]]:
+    """Validated batches from a CSV file, read ``batch_size`` rows at a time"""
+    dtypes = csv_dtypes(model)
+    with pd.read_csv(path, chunksize=batch_size, dtype=dtypes,
+                     usecols=lambda column: column in model.model_fields) as reader:
+        for chunk in reader:
+            # Missing cells become None rather than NaN
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            yield validate_batch(model, chunk.to_dict("records"), skip_invalid)
+
+def iter_json_objects(path: str) -> Iterator[dict]:
+    """Objects of a JSON array file, decoded one at a time without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, "r") as file:
+        buffer = file.read(JSON_READ_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not contain a JSON array")
+        position = 1
+        while True:
+            # Skip separators between elements
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                more = file.read(JSON_READ_SIZE)
+                if not more:
+                    raise
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            yield item
+            position = end
+            if position > JSON_READ_SIZE:
+                buffer = buffer[position:]
+                position = 0
+
+def iter_json_batches(path: str, model: Type[BaseModel], batch_size: int,
+                      skip_invalid: bool = False) -> Iterator[List[BaseModel]]:
+    """Validated batches from a JSON array file"""
+    batch = []
+    for item in iter_json_objects(path):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield validate_batch(model, batch, skip_invalid)
+            batch = []
+    if batch:
+        yield validate_batch(model, batch, skip_invalid)
+
+def iter_ndjson_batches(path: str, model: Type[BaseModel], batch_size: int,
+                        skip_invalid: bool = False) -> Iterator[List[BaseModel]]:
+    """
+    Validated batches from a newline-delimited JSON file
+
+    Lines are validated straight from JSON text, without building
+    intermediate dictionaries, unless a batch has invalid rows to skip.
+    """
+    adapter = list_adapter(model)
+
+    def validate(lines: List[bytes]) -> List[BaseModel]:
+        try:
+            return adapter.validate_json(b"[" + b",".join(lines) + b"]")
+        except ValidationError:
+            if not skip_invalid:
+                raise
+            return validate_batch(model, [json.loads(line) for line in lines], skip_invalid)
+
+    lines = []
+    with open(path, "rb") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            lines.append(line)
+            if len(lines) >= batch_size:
+                yield validate(lines)
+                lines = []
+    if lines:
+        yield validate(lines)
+
+def load_records(path: str, model: Type[BaseModel], batch_size: Optional[int] = None,
+                 file_format: Optional[str] = None, skip_invalid: bool = False) -> Iterator[List[BaseModel]]:
+    """
+    Stream a record file as batches of validated models
+
+    Memory use is bounded by the batch size whatever the file size.
+
+    Args:
+        path: CSV, JSON array, NDJSON, Parquet or Arrow IPC file
+        model: Record model, e.g. ``ProvisioningRecord`` (see RECORD_MODELS)
+        batch_size: Records per batch (defaults to LOADER_BATCH_SIZE)
+        file_format: ``csv``, ``json``, ``ndjson``, ``parquet`` or ``arrow``
+            (defaults to the file extension)
+        skip_invalid: Drop invalid records instead of raising ValidationError
+
+    Yields:
+        Lists of validated records
+    """
+    batch_size = batch_size or settings.LOADER_BATCH_SIZE
+    file_format = file_format or FILE_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format == "csv":
+        return iter_csv_batches(path, model, batch_size, skip_invalid)
+    if file_format == "json":
+        return iter_json_batches(path, model, batch_size, skip_invalid)
+    if file_format == "ndjson":
+        return iter_ndjson_batches(path, model, batch_size, skip_invalid)
+    if file_format in ("parquet", "arrow"):
+        from app.utils.columnar_io import iter_columnar_batches
+        return iter_columnar_batches(path, model, batch_size, skip_invalid, file_format)
+    raise ValueError(f"Unsupported record file format: {file_format or path}")
@@ -0,0 +1,155 @@
+"""
+SQLite key-value cache with TTL and size-based LRU eviction
+"""
+from typing import Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class SQLiteLRUCache:
+    """
+    SQLite cache of text values keyed by content hashes
+
+    Entries older than ``ttl_seconds`` are dropped when read, and least
+    recently used entries are evicted once the cache grows past
+    ``max_bytes``. Connections are opened on first use in each process, so
+    the cache can be shared by worker processes. The total size is kept in a
+    one-row meta table updated in the same transaction as every write, so
+    all processes share it without scanning the cache. Subclasses set the
+    table and value column names and build keys from their own key material.
+    """
+
+    table = "entries"
+    value_column = "value"
+
+    def __init__(self, path: str, max_bytes: int = 0, ttl_seconds: int = 0):
+        """Set up the cache; the database is opened on first use"""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection for the current process (caller holds the lock)"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    {self.value_column} TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at ON {self.table} (accessed_at)"
+            )
+            # Caches created before the meta table existed are summed once
+            self._conn.execute(
+                f"""CREATE TABLE IF NOT EXISTS {self.table}_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    total_bytes INTEGER NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO {self.table}_meta (id, total_bytes) "
+                f"SELECT 0, COALESCE(SUM(size), 0) FROM {self.table}"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _add_bytes(self, conn: sqlite3.Connection, delta: int) -> int:
+        """Adjust the stored total size and return the new total (caller holds a write transaction)"""
+        conn.execute(f"UPDATE {self.table}_meta SET total_bytes = total_bytes + ? WHERE id = 0", (delta,))
+        return conn.execute(f"SELECT total_bytes FROM {self.table}_meta WHERE id = 0").fetchone()[0]
+
+    def _delete_entry(self, conn: sqlite3.Connection, key: str):
+        """Delete one entry and account for its size (caller holds a write transaction)"""
+        row = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._add_bytes(conn, -row[0])
+
+    @staticmethod
+    def hash_key(**key_material) -> str:
+        """Cache key hashing the given fields"""
+        key_data = json.dumps(key_material, sort_keys=True, default=str)
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def get_text(self, key: str) -> Optional[str]:
+        """Return the cached value for ``key``, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                f"SELECT {self.value_column}, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            expired = bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+            if expired:
+                conn.execute("BEGIN IMMEDIATE")
+                self._delete_entry(conn, key)
+            else:
+                conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return None if expired else value
+
+    def set_text(self, key: str, value: str):
+        """Store a value, evicting least recently used entries if over size"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            conn = self._connection()
+            # Other processes write too, so the size bookkeeping runs in one write transaction
+            conn.execute("BEGIN IMMEDIATE")
+            previous = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                f"(key, {self.value_column}, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            total_bytes = self._add_bytes(conn, size - (previous[0] if previous else 0))
+            if self.max_bytes and total_bytes > self.max_bytes:
+                self._evict(conn, total_bytes - self.max_bytes)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, bytes_to_free: int):
+        """Delete least recently used entries until ``bytes_to_free`` is reclaimed (caller holds a write transaction)"""
+        freed = 0
+        evicted = []
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at"):
+            if freed >= bytes_to_free:
+                break
+            evicted.append((key,))
+            freed += size
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", evicted)
+        self._add_bytes(conn, -freed)
+
+    def delete(self, key: str):
+        """Remove the cached value for ``key``, if any"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            self._delete_entry(conn, key)
+            conn.commit()
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.execute(f"UPDATE {self.table}_meta SET total_bytes = 0 WHERE id = 0")
+            conn.commit()
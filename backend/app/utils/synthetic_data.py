@@ -0,0 +1,358 @@
+"""
+Seeded, vectorized synthetic datasets with labelled injected leakages
+"""
+from math import gcd
+from typing import Dict, Iterator, Optional
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import typer
+from app.utils.columnar_io import DATASET_MODELS, ColumnarWriter, arrow_schema
+
+# Share of provisions receiving each injected leakage
+DEFAULT_LEAK_RATES = {
+    "missing_charge": 0.02,     # Provisioned but never billed
+    "incorrect_rate": 0.02,     # Billed below the contract rate
+    "usage_mismatch": 0.02,     # Recorded usage above the billed amount
+    "duplicate_exact": 0.01,    # Second identical bill under a new ID
+    "duplicate_near": 0.01      # Second bill for the same period with a slightly different amount
+}
+
+# Incident type and variant recorded in the labels for each leakage
+LEAK_LABELS = {
+    "missing_charge": ("missing_charge", ""),
+    "incorrect_rate": ("incorrect_rate", ""),
+    "usage_mismatch": ("usage_mismatch", ""),
+    "duplicate_exact": ("duplicate_entry", "exact"),
+    "duplicate_near": ("duplicate_entry", "near")
+}
+
+# Billed amount and usage total difference UsageMismatchRule tolerates
+USAGE_MATCH_TOLERANCE = 1.0
+
+PLANS = np.array(["BASIC", "STANDARD", "PREMIUM", "ENTERPRISE"])
+BILL_STATUSES = np.array(["paid", "unpaid", "overdue"])
+USAGE_TYPES = np.array(["bandwidth", "storage", "api_calls", "transactions"])
+USAGE_UNITS = np.array(["GB", "MB", "calls", "transactions"])
+
+LABEL_COLUMNS = ["leak_type", "variant", "billing_id", "provisioning_id", "duplicate_of",
+                 "customer_id", "service_id", "expected_amount", "billed_amount", "financial_impact"]
+
+# Columnar schema of the labels, which have no record model
+LABEL_SCHEMA = pa.schema(
+    [pa.field(name, pa.string()) for name in LABEL_COLUMNS[:7]]
+    + [pa.field(name, pa.float64()) for name in LABEL_COLUMNS[7:]]
+)
+
+def prefixed(prefix: str, numbers: np.ndarray) -> pd.Series:
+    """IDs such as ``BILL-42`` for an array of numbers"""
+    return prefix + pd.Series(numbers).astype(str)
+
+def date_strings(dates: np.ndarray) -> np.ndarray:
+    """``YYYY-MM-DD`` strings for an array of ``datetime64[D]``"""
+    # Few distinct dates, so format each once and index into the result
+    distinct, inverse = np.unique(dates.astype("datetime64[D]"), return_inverse=True)
+    return distinct.astype(str)[inverse]
+
+class SyntheticDataGenerator:
+    """
+    Generate consistent billing, provisioning, usage and contract records at scale
+
+    Every customer has one active contract whose rate clause reads
+    ``Service rate is $X per month``. Each provision is a distinct
+    (customer, service, month) and, unless a leakage is injected, is billed
+    once at the contract rate for the calendar month it starts in, with the
+    billing date on the last day of that month. Usage records on the billing
+    date add up to the billed amount (one unit per dollar), matching the
+    detection rules' assumptions. Injected leakages are listed in a label
+    table with the affected IDs and the expected financial impact. A
+    near-duplicate bill also no longer matches its usage, so it gets a
+    second ``usage_mismatch`` label (variant ``near``) when the difference
+    exceeds USAGE_MATCH_TOLERANCE.
+
+    Records are generated in chunks from a per-chunk seed, so output is
+    reproducible for a given seed and chunk size, and memory is bounded by
+    the chunk size.
+    """
+
+    def __init__(self, seed: int = 0, num_customers: int = 10000, num_services: int = 100,
+                 months: int = 12, start_month: str = "2025-01",
+                 leak_rates: Optional[Dict[str, float]] = None, max_usage_records: int = 4):
+        """
+        Args:
+            seed: Random seed
+            num_customers: Customers, each with one contract
+            num_services: Services a customer can be provisioned with
+            months: Calendar months covered, starting at ``start_month`` (``YYYY-MM``)
+            leak_rates: Overrides of DEFAULT_LEAK_RATES
+            max_usage_records: Most usage records per bill
+        """
+        self.seed = seed
+        self.num_customers = num_customers
+        self.num_services = num_services
+        self.months = months
+        unknown = set(leak_rates or {}) - set(DEFAULT_LEAK_RATES)
+        if unknown:
+            raise ValueError(f"Unknown leak types: {', '.join(sorted(unknown))}")
+        self.leak_rates = {**DEFAULT_LEAK_RATES, **(leak_rates or {})}
+        if sum(self.leak_rates.values()) > 1.0:
+            raise ValueError("Leak rates must add up to at most 1")
+        self.max_usage_records = max_usage_records
+
+        start = np.datetime64(start_month, "M")
+        self.month_starts = (start + np.arange(months)).astype("datetime64[D]")
+        self.month_ends = (start + np.arange(1, months + 1)).astype("datetime64[D]") - 1
+
+        rng = np.random.default_rng(seed)
+        self.rates = np.round(rng.uniform(100.0, 1000.0, num_customers), 2)
+
+        # Affine bijection over all (customer, service, month) keys, so
+        # provisions are unique without tracking which keys were used
+        self.key_space = num_customers * num_services * months
+        self._multiplier = int(self.key_space * 0.6180339887) | 1
+        while gcd(self._multiplier, self.key_space) != 1:
+            self._multiplier += 2
+        self._offset = int(rng.integers(0, self.key_space))
+
+    def contracts(self) -> list:
+        """One active contract with a rate clause per customer, as dictionaries"""
+        effective = str(self.month_starts[0] - 30)
+        return [
+            {
+                "id": f"CONTRACT-{customer}",
+                "customer_id": f"CUST-{customer}",
+                "contract_date": effective,
+                "effective_date": effective,
+                "expiry_date": None,
+                "status": "active",
+                "clauses": [{
+                    "id": f"CLAUSE-{customer}-01",
+                    "contract_id": f"CONTRACT-{customer}",
+                    "clause_type": "rate",
+                    "content": f"Service rate is ${rate:.2f} per month",
+                    "effective_date": effective,
+                    "expiry_date": None
+                }]
+            }
+            for customer, rate in enumerate(self.rates)
+        ]
+
+    def _chunk(self, start: int, stop: int, chunk_index: int) -> Dict[str, pd.DataFrame]:
+        """Provisions ``start`` to ``stop`` with their bills, usage and labels"""
+        rng = np.random.default_rng([self.seed, chunk_index])
+        n = stop - start
+        numbers = np.arange(start, stop, dtype=np.int64)
+
+        keys = (numbers * self._multiplier + self._offset) % self.key_space
+        customers = keys // (self.num_services * self.months)
+        services = (keys // self.months) % self.num_services
+        months = keys % self.months
+        days_in_month = (self.month_ends[months] - self.month_starts[months]).astype(int) + 1
+        start_dates = self.month_starts[months] + rng.integers(0, days_in_month)
+
+        customer_ids = prefixed("CUST-", customers)
+        service_ids = prefixed("SERVICE-", services)
+        provisioning_ids = prefixed("PROV-", numbers)
+        provisioning = pd.DataFrame({
+            "id": provisioning_ids,
+            "customer_id": customer_ids,
+            "service_id": service_ids,
+            "provision_date": date_strings(start_dates - rng.integers(0, 8, n)),
+            "status": "active",
+            "plan_id": PLANS[rng.integers(0, len(PLANS), n)],
+            "start_date": date_strings(start_dates),
+            "end_date": None
+        })
+
+        # Mutually exclusive leak assignment per provision
+        leak_names = list(self.leak_rates)
+        thresholds = np.cumsum([self.leak_rates[name] for name in leak_names])
+        draws = rng.random(n)
+        leak = np.searchsorted(thresholds, draws, side="right")
+        is_leak = {name: leak == index for index, name in enumerate(leak_names)}
+
+        rates = self.rates[customers]
+        amounts = rates.copy()
+        amounts[is_leak["incorrect_rate"]] = np.round(
+            rates[is_leak["incorrect_rate"]] * rng.uniform(0.5, 0.95, is_leak["incorrect_rate"].sum()), 2
+        )
+        usage_totals = amounts.copy()
+        usage_totals[is_leak["usage_mismatch"]] = np.round(
+            amounts[is_leak["usage_mismatch"]] * rng.uniform(1.05, 1.5, is_leak["usage_mismatch"].sum()), 2
+        )
+
+        billing_dates = self.month_ends[months]
+        billing = pd.DataFrame({
+            "id": prefixed("BILL-", numbers),
+            "customer_id": customer_ids,
+            "invoice_id": prefixed("INV-", numbers),
+            "service_id": service_ids,
+            "amount": amounts,
+            "currency": "USD",
+            "billing_date": date_strings(billing_dates),
+            "due_date": date_strings(billing_dates + 30),
+            "status": BILL_STATUSES[rng.integers(0, len(BILL_STATUSES), n)],
+            "billing_period_start": date_strings(self.month_starts[months]),
+            "billing_period_end": date_strings(billing_dates)
+        })
+        billed = ~is_leak["missing_charge"]
+
+        # Second bills for duplicated provisions
+        duplicates = {}
+        for name in ["duplicate_exact", "duplicate_near"]:
+            duplicate = billing[is_leak[name]].copy()
+            duplicate["id"] = duplicate["id"] + "-D"
+            duplicate["invoice_id"] = duplicate["invoice_id"] + "-D"
+            if name == "duplicate_near":
+                change = rng.choice([-1, 1], len(duplicate)) * rng.uniform(0.005, 0.02, len(duplicate))
+                duplicate["amount"] = np.round(duplicate["amount"] * (1 + change), 2)
+            duplicates[name] = duplicate
+
+        # Usage records on the billing date adding up to the usage total
+        usage_index = np.flatnonzero(billed)
+        counts = rng.integers(1, self.max_usage_records + 1, len(usage_index))
+        owners = np.repeat(usage_index, counts)
+        group_starts = np.cumsum(counts) - counts
+        positions = np.arange(len(owners)) - np.repeat(group_starts, counts)
+        weights = rng.random(len(owners)) + 0.1
+        shares = weights / np.repeat(np.add.reduceat(weights, group_starts), counts)
+        quantities = np.round(usage_totals[owners] * shares, 2)
+        last = group_starts + counts - 1
+        quantities[last] = np.round(
+            usage_totals[usage_index] - (np.add.reduceat(quantities, group_starts) - quantities[last]), 2
+        )
+        usage_kind = services[owners] % len(USAGE_TYPES)
+        usage = pd.DataFrame({
+            "id": "USAGE-" + pd.Series(numbers[owners]).astype(str) + "-" + pd.Series(positions).astype(str),
+            "customer_id": customer_ids.to_numpy()[owners],
+            "service_id": service_ids.to_numpy()[owners],
+            "usage_date": date_strings(billing_dates[owners]),
+            "usage_type": USAGE_TYPES[usage_kind],
+            "quantity": quantities,
+            "unit": USAGE_UNITS[usage_kind],
+            "cost": quantities
+        })
+
+        labels = []
+        for name, mask in is_leak.items():
+            if not mask.any():
+                continue
+            leak_type, variant = LEAK_LABELS[name]
+            rows = billing[mask]
+            label = pd.DataFrame({
+                "leak_type": leak_type,
+                "variant": variant,
+                "billing_id": rows["id"].to_numpy(),
+                "provisioning_id": provisioning_ids[mask].to_numpy(),
+                "duplicate_of": None,
+                "customer_id": rows["customer_id"].to_numpy(),
+                "service_id": rows["service_id"].to_numpy(),
+                "expected_amount": rates[mask],
+                "billed_amount": amounts[mask],
+                "financial_impact": np.round(rates[mask] - amounts[mask], 2)
+            })
+            if name == "missing_charge":
+                label["billing_id"] = None
+                label["billed_amount"] = 0.0
+                label["financial_impact"] = rates[mask]
+            elif name == "usage_mismatch":
+                label["financial_impact"] = np.round(usage_totals[mask] - amounts[mask], 2)
+            elif name in duplicates:
+                label["billing_id"] = duplicates[name]["id"].to_numpy()
+                label["duplicate_of"] = rows["id"].to_numpy()
+                label["billed_amount"] = duplicates[name]["amount"].to_numpy()
+                label["financial_impact"] = duplicates[name]["amount"].to_numpy()
+            labels.append(label)
+
+            if name == "duplicate_near":
+                # The changed amount no longer matches the usage recorded for the billing date
+                gap = np.round(usage_totals[mask] - duplicates[name]["amount"].to_numpy(), 2)
+                mismatched = np.abs(gap) > USAGE_MATCH_TOLERANCE
+                if mismatched.any():
+                    mismatch = label[mismatched].copy()
+                    mismatch["leak_type"] = "usage_mismatch"
+                    mismatch["expected_amount"] = usage_totals[mask][mismatched]
+                    mismatch["financial_impact"] = gap[mismatched]
+                    labels.append(mismatch)
+
+        return {
+            "provisioning": provisioning,
+            "billing": pd.concat([billing[billed], *duplicates.values()], ignore_index=True),
+            "usage": usage,
+            "labels": pd.concat(labels, ignore_index=True) if labels else pd.DataFrame(columns=LABEL_COLUMNS)
+        }
+
+    def generate(self, num_provisions: int, chunk_size: int = 1_000_000) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        Generate datasets chunk by chunk
+
+        Yields:
+            Dictionaries of ``provisioning``, ``billing``, ``usage`` and
+            ``labels`` DataFrames for up to ``chunk_size`` provisions each
+        """
+        if num_provisions > self.key_space:
+            raise ValueError(
+                f"{num_provisions} provisions exceed the {self.key_space} distinct (customer, service, month) keys"
+            )
+        for chunk_index, start in enumerate(range(0, num_provisions, chunk_size)):
+            yield self._chunk(start, min(start + chunk_size, num_provisions), chunk_index)
+
+    def write(self, output_dir: str, num_provisions: int, chunk_size: int = 1_000_000,
+              file_format: str = "csv") -> Dict[str, str]:
+        """
+        Write the datasets and labels as CSV, Parquet or Arrow IPC files and contracts as JSON
+
+        Returns:
+            File path per dataset
+        """
+        if file_format not in ("csv", "parquet", "arrow"):
+            raise ValueError(f"Unsupported file format: {file_format}")
+        os.makedirs(output_dir, exist_ok=True)
+        names = ["provisioning", "billing", "usage", "labels"]
+        paths = {name: os.path.join(output_dir, f"{name}.{file_format}") for name in names}
+
+        if file_format == "csv":
+            for index, datasets in enumerate(self.generate(num_provisions, chunk_size)):
+                for name, frame in datasets.items():
+                    frame.to_csv(paths[name], mode="w" if index == 0 else "a", header=index == 0, index=False)
+        else:
+            schemas = {name: arrow_schema(model) for name, model in DATASET_MODELS.items()}
+            schemas["labels"] = LABEL_SCHEMA
+            writers = {name: ColumnarWriter(paths[name], schemas[name], file_format) for name in names}
+            try:
+                for datasets in self.generate(num_provisions, chunk_size):
+                    for name, frame in datasets.items():
+                        writers[name].write(pa.Table.from_pandas(frame, preserve_index=False))
+            finally:
+                for writer in writers.values():
+                    writer.close()
+
+        paths["contracts"] = os.path.join(output_dir, "contracts.json")
+        with open(paths["contracts"], "w") as file:
+            json.dump(self.contracts(), file)
+        return paths
+
+cli = typer.Typer(help="Synthetic revenue leakage datasets")
+
+@cli.command()
+def generate(
+    output_dir: str = typer.Argument(..., help="Directory receiving the dataset files"),
+    provisions: int = typer.Option(100000, help="Provisioning records to generate"),
+    customers: int = typer.Option(10000, help="Customers, one contract each"),
+    services: int = typer.Option(100, help="Distinct services"),
+    months: int = typer.Option(12, help="Calendar months covered"),
+    start_month: str = typer.Option("2025-01", help="First month (YYYY-MM)"),
+    seed: int = typer.Option(0, help="Random seed"),
+    chunk_size: int = typer.Option(1_000_000, help="Provisions generated per chunk"),
+    file_format: str = typer.Option("csv", help="Dataset file format: csv, parquet or arrow")
+):
+    """Generate a labelled synthetic dataset"""
+    generator = SyntheticDataGenerator(seed=seed, num_customers=customers, num_services=services,
+                                       months=months, start_month=start_month)
+    for name, path in generator.write(output_dir, provisions, chunk_size, file_format).items():
+        print(f"{name}: {path}")
+
+if __name__ == "__main__":
+    cli()
@@ -25,6 +25,11 @@ def test_data_generator():
     print(f"Generated JSON: {json_path}")
     print(f"JSON records: {len(json_data)}")
     
+    print("\nGenerating Parquet billing, provisioning and usage files...")
+    columnar_files = generator.generate_columnar_files()
+    for dataset, (path, data) in columnar_files.items():
+        print(f"Generated Parquet: {path} ({len(data)} {dataset} records)")
+    
     # Test reading files
     print("\nTesting file reading...")
     
@@ -39,6 +44,11 @@ def test_data_generator():
     # Read JSON
     json_content = generator.read_json_file(json_path)
     print(f"JSON records read: {len(json_content) if json_content else 0}")
+    
+    # Read Parquet, only the columns needed
+    for dataset, (path, _) in columnar_files.items():
+        columnar_content = generator.read_columnar_file(path, columns=["id", "customer_id"])
+        print(f"{dataset.capitalize()} Parquet records read: {len(columnar_content) if columnar_content else 0}")
 
 if __name__ == "__main__":
     test_data_generator()
\ No newline at end of file
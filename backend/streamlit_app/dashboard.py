@@ -31,6 +31,12 @@ except ImportError as e:
     IMPORT_ERRORS.append(f"OCRReader: {e}")
     IMPORT_SUCCESS = False
 
+try:
+    from app.utils.invoice_extractor import InvoiceExtractor
+except ImportError as e:
+    IMPORT_ERRORS.append(f"InvoiceExtractor: {e}")
+    IMPORT_SUCCESS = False
+
 # Additional imports that might be needed
 try:
     import cv2
@@ -425,9 +431,9 @@ elif page == "Data Generator":
     
     with tab2:
         st.subheader("Upload Your Data Files")
-        st.write("Upload your own PDF, CSV, or JSON files for processing.")
+        st.write("Upload your own PDF, CSV, JSON, Parquet or Arrow files for processing.")
         
-        uploaded_file = st.file_uploader("Choose a file", type=["pdf", "csv", "json"])
+        uploaded_file = st.file_uploader("Choose a file", type=["pdf", "csv", "json", "parquet", "arrow", "feather"])
         
         if uploaded_file is not None:
             # Create a temporary file to save the uploaded file
@@ -441,13 +447,19 @@ elif page == "Data Generator":
             file_extension = os.path.splitext(uploaded_file.name)[1].lower()
             
             if file_extension == ".pdf":
-                st.subheader("PDF Content (OCR)")
-                with st.spinner("Processing PDF with OCR..."):
-                    # For demo purposes, we'll just show file info
-                    # In a real implementation, you would use OCR to extract text
-                    st.info("In a full implementation, this would use OCR to extract text from the PDF.")
-                    st.write(f"File size: {len(uploaded_file.getvalue())} bytes")
-                    st.write(f"File name: {uploaded_file.name}")
+                st.subheader("Billing Records (PDF)")
+                with st.spinner("Extracting invoice table..."):
+                    try:
+                        records, errors = InvoiceExtractor().extract_pdf(tmp_file_path)
+                        st.write(f"Billing records: {len(records)}")
+                        if records:
+                            st.dataframe(pd.DataFrame([record.dict() for record in records]))
+                        else:
+                            st.info("No billing table found in this PDF.")
+                        for error in errors:
+                            st.warning(error)
+                    except Exception as e:
+                        st.error(f"Error reading PDF: {e}")
                     
             elif file_extension == ".csv":
                 st.subheader("CSV Data")
@@ -468,6 +480,17 @@ elif page == "Data Generator":
                     st.json(data)
                 except Exception as e:
                     st.error(f"Error reading JSON: {e}")
+                    
+            elif file_extension in (".parquet", ".arrow", ".feather"):
+                st.subheader("Columnar Data")
+                try:
+                    # Read Parquet or Arrow IPC file
+                    df = generator.read_columnar_file(tmp_file_path)
+                    df = pd.DataFrame(df or [])
+                    st.write(f"Rows: {len(df)}, Columns: {len(df.columns)}")
+                    st.dataframe(df)
+                except Exception as e:
+                    st.error(f"Error reading columnar file: {e}")
             
             # Clean up temporary file
             try:
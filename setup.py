@@ -25,6 +25,8 @@ setup(
         "pillow",
         "langchain-google-genai",
         "opencv-python-headless",
+        "pyarrow",
+        "python-multipart",
     ],
     python_requires=">=3.8",
     classifiers=[